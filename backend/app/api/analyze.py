@@ -1,15 +1,23 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Dict, List, Any, Optional, Union
+import uuid
 
-from app.core.database import get_db, DocumentRequest, RedactedDocument
-from app.services.openai_service import GSAAssistantService
+from app.core.config import settings
+from app.core.database import get_db, DocumentRequest
+from app.services.analysis_service import (
+    get_request_with_documents, prepare_documents, run_analysis, store_analysis
+)
+from app.workers.celery_app import run_analysis_task
 
 router = APIRouter()
 
 class AnalyzeRequest(BaseModel):
-    request_id: str = Field(..., description="Request ID from ingestion")
+    request_id: uuid.UUID = Field(..., description="Request ID from ingestion")
 
 class ComplianceProblem(BaseModel):
     code: str = Field(..., description="Problem code")
@@ -36,24 +44,58 @@ class RuleCitation(BaseModel):
     chunk: str = Field(..., description="Relevant rule text")
 
 class AnalyzeResponse(BaseModel):
-    parsed: ParsedFields
+    model_config = ConfigDict(extra='ignore')
+    
+    parsed: ParsedFields = Field(default_factory=ParsedFields)
     checklist: ComplianceChecklist
-    brief: str
-    client_email: str
-    citations: List[RuleCitation]
-    request_id: str
+    brief: str = ""
+    client_email: str = ""
+    citations: List[RuleCitation] = Field(default=[])
+    request_id: uuid.UUID
     status: str = "completed"
 
+async def _enqueue_analysis(request_id: uuid.UUID, db: AsyncSession) -> ORJSONResponse:
+    """Mark a request as queued and hand it to the background worker"""
+    doc_request = (await db.execute(
+        select(DocumentRequest).where(DocumentRequest.request_id == request_id)
+    )).scalar_one_or_none()
+    
+    if not doc_request:
+        raise HTTPException(status_code=404, detail="Request not found")
+    
+    if doc_request.status == "error":
+        raise HTTPException(status_code=400, detail="Previous ingestion had errors")
+    
+    previous_status = doc_request.status
+    doc_request.status = "queued"
+    await db.commit()
+    
+    # Publishing is blocking broker I/O; undo the status if it fails so clients stop polling
+    try:
+        await run_in_threadpool(run_analysis_task.delay, str(request_id))
+    except Exception as e:
+        doc_request.status = previous_status
+        await db.commit()
+        raise HTTPException(status_code=503, detail=f"Analysis queue unavailable: {e}")
+    
+    return ORJSONResponse(
+        status_code=202,
+        content={"request_id": request_id, "status": "queued"}
+    )
+
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_documents(
     request: AnalyzeRequest,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: AsyncSession = Depends(get_db)
 ):
     
-    # Find the document request
-    doc_request = db.query(DocumentRequest).filter(
-        DocumentRequest.request_id == request.request_id
-    ).first()
+    # Hand off to the worker queue; clients poll GET /analyze/{request_id}
+    if settings.ANALYSIS_QUEUE_ENABLED:
+        return await _enqueue_analysis(request.request_id, db)
+    
+    # Find the document request together with its documents
+    doc_request = await get_request_with_documents(db, request.request_id)
     
     if not doc_request:
         raise HTTPException(status_code=404, detail="Request not found")
@@ -61,78 +103,64 @@ async def analyze_documents(
     if doc_request.status == "error":
         raise HTTPException(status_code=400, detail="Previous ingestion had errors")
     
-    # Get the redacted documents
-    redacted_docs = db.query(RedactedDocument).filter(
-        RedactedDocument.request_id == request.request_id
-    ).all()
-    
-    if not redacted_docs:
+    if not doc_request.documents:
         raise HTTPException(status_code=404, detail="No documents found for this request")
     
-    # Prepare documents for analysis (use original text for better field extraction)
-    documents = []
-    for doc in redacted_docs:
-        documents.append({
-            "name": doc.name,
-            "text": doc.original_text
-        })
+    documents = prepare_documents(doc_request)
     
-    # Initialize OpenAI service
     try:
-        openai_service = GSAAssistantService()
-        
-        # Analyze documents
-        analysis_result = openai_service.analyze_documents(request.request_id, documents)
+        # Analyze documents (reusing a cached result when available)
+        analysis_result, cache_hit = await run_analysis(str(request.request_id), documents)
+        response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
         
         if "error" in analysis_result:
             # Update request status
             doc_request.status = "error"
-            db.commit()
+            doc_request.error_message = str(analysis_result["error"])
+            await db.commit()
             raise HTTPException(status_code=500, detail=analysis_result["error"])
         
         # Update request with analysis results
-        doc_request.status = "processed"
-        doc_request.parsed_fields = analysis_result.get("parsed", {})
-        doc_request.checklist = analysis_result.get("checklist", {})
-        doc_request.brief = analysis_result.get("brief", "")
-        doc_request.client_email = analysis_result.get("client_email", "")
-        doc_request.citations = analysis_result.get("citations", [])
-        
-        db.commit()
+        store_analysis(doc_request, analysis_result)
+        await db.commit()
         
         # Return structured response
-        return AnalyzeResponse(
-            parsed=ParsedFields(**analysis_result.get("parsed", {})),
-            checklist=ComplianceChecklist(**analysis_result.get("checklist", {})),
-            brief=analysis_result.get("brief", ""),
-            client_email=analysis_result.get("client_email", ""),
-            citations=[RuleCitation(**citation) for citation in analysis_result.get("citations", [])],
-            request_id=request.request_id,
-            status="completed"
-        )
+        return AnalyzeResponse.model_validate({
+            **analysis_result,
+            "request_id": request.request_id,
+            "status": "completed"
+        })
     
     except HTTPException:
         raise
     except Exception as e:
         # Update request status
         doc_request.status = "error"
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+        doc_request.error_message = f"Analysis failed: {str(e)}"
+        await db.commit()
+        raise HTTPException(status_code=500, detail=doc_request.error_message)
 
 @router.get("/analyze/{request_id}")
 async def get_analysis_results(
-    request_id: str,
-    db: Session = Depends(get_db)
+    request_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db)
 ):
     """Get analysis results for a completed request"""
     
-    doc_request = db.query(DocumentRequest).filter(
-        DocumentRequest.request_id == request_id
-    ).first()
+    doc_request = (await db.execute(
+        select(DocumentRequest).where(DocumentRequest.request_id == request_id)
+    )).scalar_one_or_none()
     
     if not doc_request:
         raise HTTPException(status_code=404, detail="Request not found")
     
+    if doc_request.status == "error":
+        return {
+            "request_id": request_id,
+            "status": "error",
+            "message": doc_request.error_message or "Analysis failed"
+        }
+    
     if doc_request.status != "processed":
         return {
             "request_id": request_id,
@@ -140,12 +168,12 @@ async def get_analysis_results(
             "message": "Analysis not yet completed"
         }
     
-    return AnalyzeResponse(
-        parsed=ParsedFields(**doc_request.parsed_fields or {}),
-        checklist=ComplianceChecklist(**doc_request.checklist or {}),
-        brief=doc_request.brief or "",
-        client_email=doc_request.client_email or "",
-        citations=[RuleCitation(**citation) for citation in doc_request.citations or []],
-        request_id=request_id,
-        status="completed"
-    )
+    return AnalyzeResponse.model_validate({
+        "parsed": doc_request.parsed_fields or {},
+        "checklist": doc_request.checklist or {},
+        "brief": doc_request.brief or "",
+        "client_email": doc_request.client_email or "",
+        "citations": doc_request.citations or [],
+        "request_id": request_id,
+        "status": "completed"
+    })
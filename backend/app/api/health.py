@@ -2,30 +2,45 @@
 Health check endpoints
 """
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.core.database import get_db
+from fastapi import APIRouter
+from sqlalchemy import text
+import time
+from app.core.config import settings
+from app.core.database import ScopedSession, get_db_scoped
 
 router = APIRouter()
 
+# Last health result and its expiry (monotonic seconds), to absorb probe storms
+_cached_health = {"result": None, "expires": 0.0}
+
 @router.get("/healthz")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check():
     """Health check endpoint"""
+    now = time.monotonic()
+    if _cached_health["result"] is not None and now < _cached_health["expires"]:
+        return _cached_health["result"]
+    
     try:
         # Test database connection
-        from sqlalchemy import text
-        db.execute(text("SELECT 1"))
-        return {
+        try:
+            await get_db_scoped().execute(text("SELECT 1"))
+        finally:
+            await ScopedSession.remove()
+        result = {
             "ok": True,
             "status": "healthy",
             "service": "getgsa-api",
             "database": "connected"
         }
     except Exception as e:
-        return {
+        result = {
             "ok": False,
             "status": "unhealthy",
             "service": "getgsa-api",
             "database": "disconnected",
             "error": str(e)
         }
+    
+    _cached_health["result"] = result
+    _cached_health["expires"] = now + settings.HEALTH_CACHE_TTL_SECONDS
+    return result
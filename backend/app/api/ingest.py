@@ -3,10 +3,15 @@ Document ingestion endpoints
 """
 
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import re
 import uuid
+import zstandard
 from datetime import datetime
 
 from app.core.database import get_db, DocumentRequest, RedactedDocument
@@ -15,6 +20,20 @@ from app.core.config import settings
 
 router = APIRouter()
 
+# Whitespace-delimited word, counted without materializing a list
+_WORD_RE = re.compile(r'\S+')
+
+# Worker pool for CPU-bound PII redaction, kept off the event loop
+executor = ProcessPoolExecutor(max_workers=settings.INGEST_WORKERS)
+
+def _process_doc(text: str) -> Tuple[Dict[str, List[str]], str, int, bytes]:
+    """Extract PII, redact, count words and compress the original (runs in a worker process)"""
+    pii_found = PIIRedactor.extract_pii(text)
+    redacted_text = PIIRedactor.redact_text(text)
+    word_count = sum(1 for _ in _WORD_RE.finditer(redacted_text))
+    original_zstd = zstandard.ZstdCompressor(level=3).compress(text.encode('utf-8'))
+    return pii_found, redacted_text, word_count, original_zstd
+
 class Document(BaseModel):
     """Document model for ingestion"""
     name: str = Field(..., description="Document name")
@@ -35,14 +54,14 @@ class DocumentSummary(BaseModel):
 class IngestResponse(BaseModel):
     """Response model for document ingestion"""
     doc_summaries: List[DocumentSummary]
-    request_id: str
+    request_id: uuid.UUID
     total_documents: int
     total_word_count: int
 
 @router.post("/ingest", response_model=IngestResponse)
 async def ingest_documents(
     request: IngestRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Ingest documents for analysis.
@@ -62,66 +81,70 @@ async def ingest_documents(
         )
     
     # Generate request ID
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4()
+    
+    # Validate documents before fanning out to the worker pool
+    valid = [not InputValidator.validate_document_content(doc.model_dump()) for doc in request.documents]
+    
+    # Extract PII, redact and count words in parallel across worker processes
+    loop = asyncio.get_running_loop()
+    results = iter(await asyncio.gather(*(
+        loop.run_in_executor(executor, _process_doc, doc.text)
+        for doc, ok in zip(request.documents, valid) if ok
+    )))
     
     # Process documents
-    doc_summaries = []
+    doc_summaries = [None] * len(request.documents)
+    rows = []
     total_word_count = 0
     
-    for doc in request.documents:
-        # Validate document
-        issues = InputValidator.validate_document_content(doc.dict())
-        if issues:
-            doc_summaries.append(DocumentSummary(
+    for i, (doc, ok) in enumerate(zip(request.documents, valid)):
+        if not ok:
+            doc_summaries[i] = DocumentSummary(
                 name=doc.name,
                 status="error",
                 redacted_preview="",
                 word_count=0,
                 pii_found={}
-            ))
+            )
             continue
         
-        # Extract PII before redaction
-        pii_found = PIIRedactor.extract_pii(doc.text)
-        
-        # Redact PII
-        redacted_text = PIIRedactor.redact_text(doc.text)
+        pii_found, redacted_text, word_count, original_zstd = next(results)
         
         # Create preview (first 200 chars)
         preview = redacted_text[:200] + "..." if len(redacted_text) > 200 else redacted_text
-        
-        # Count words
-        word_count = len(redacted_text.split())
         total_word_count += word_count
         
-        # Store in database
-        redacted_doc = RedactedDocument(
-            request_id=request_id,
-            name=doc.name,
-            original_text=doc.text,  # Store original for reference
-            redacted_text=redacted_text,
-            word_count=word_count
-        )
-        db.add(redacted_doc)
+        # Queue row for a single bulk insert
+        rows.append({
+            "request_id": request_id,
+            "name": doc.name,
+            "original_text_zstd": original_zstd,  # Compressed original for field extraction
+            "redacted_text": redacted_text,
+            "word_count": word_count
+        })
         
-        doc_summaries.append(DocumentSummary(
+        doc_summaries[i] = DocumentSummary(
             name=doc.name,
             status="stored",
             redacted_preview=preview,
             word_count=word_count,
             pii_found=pii_found
-        ))
+        )
     
     # Create document request record
     doc_request = DocumentRequest(
         request_id=request_id,
         status="pending",
-        doc_summaries=[summary.dict() for summary in doc_summaries]
+        doc_summaries=doc_summaries  # Models are dumped while packing (see MsgpackType)
     )
-    db.add(doc_request)
     
-    # Commit to database
-    db.commit()
+    # Write the request and all documents in one transaction
+    async with db.begin():
+        db.add(doc_request)
+        await db.flush()
+        if rows:
+            await db.execute(insert(RedactedDocument), rows)
     
     return IngestResponse(
         doc_summaries=doc_summaries,
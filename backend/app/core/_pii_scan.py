@@ -0,0 +1,74 @@
+"""
+Numba prefilter that locates the regions of a document that may contain PII
+
+Every PII match contains an '@' or an ASCII digit and spans at most a few
+whitespace-separated tokens, so only tokens within MAX_MATCH_TOKENS of such a
+"trigger" token need to go through the regex engine. Windows are cut on
+whitespace, which keeps regex results inside each window identical to a scan
+of the full text.
+"""
+
+from typing import List, Optional, Tuple
+
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
+
+# Upper bound on tokens in one match ("user @ domain . com" is five)
+MAX_MATCH_TOKENS = 6
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _find_candidate_spans(codes, margin):
+        n = codes.shape[0]
+        starts = np.empty(n, dtype=np.int64)
+        ends = np.empty(n, dtype=np.int64)
+        triggered = np.zeros(n, dtype=np.bool_)
+
+        # Split into tokens on ASCII whitespace, flagging tokens with '@' or a digit
+        count = 0
+        i = 0
+        while i < n:
+            c = codes[i]
+            if c == 32 or (9 <= c <= 13):
+                i += 1
+                continue
+            starts[count] = i
+            while i < n:
+                c = codes[i]
+                if c == 32 or (9 <= c <= 13):
+                    break
+                if c == 64 or (48 <= c <= 57):
+                    triggered[count] = True
+                i += 1
+            ends[count] = i
+            count += 1
+
+        # Merge [token - margin, token + margin] windows around trigger tokens
+        spans = []
+        lo = -1
+        hi = -1
+        for t in range(count):
+            if not triggered[t]:
+                continue
+            first = max(t - margin, 0)
+            last = min(t + margin, count - 1)
+            if lo >= 0 and first <= hi + 1:
+                hi = last
+            else:
+                if lo >= 0:
+                    spans.append((starts[lo], ends[hi]))
+                lo = first
+                hi = last
+        if lo >= 0:
+            spans.append((starts[lo], ends[hi]))
+        return spans
+
+def find_candidate_spans(text: str) -> Optional[List[Tuple[int, int]]]:
+    """Return (start, end) character spans that may contain PII, or None without Numba"""
+    if numba is None:
+        return None
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return [(int(start), int(end)) for start, end in _find_candidate_spans(codes, MAX_MATCH_TOKENS)]
@@ -0,0 +1,73 @@
+"""
+Redis cache for analysis results keyed by document content
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+import orjson
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared async client (None disables caching)
+redis_client = redis.from_url(settings.REDIS_URL) if settings.REDIS_URL else None
+
+def analysis_cache_key(documents: List[Dict[str, str]]) -> str:
+    """Order-independent key over document names and texts, scoped to the analysis model
+
+    Shared by every exact-match cache tier (Redis here, disk in the OpenAI service).
+    """
+    digest = hashlib.sha256(settings.OPENAI_MODEL.encode())
+    for part in sorted((doc["name"] + doc["text"]).encode() for doc in documents):
+        digest.update(hashlib.sha256(part).digest())
+    return "analyze:" + digest.hexdigest()
+
+def entity_cache_key(analysis_result: Dict[str, Any]) -> str:
+    """Tag identifying the entity an analysis result belongs to"""
+    parsed = analysis_result.get("parsed") or {}
+    identity = f"{parsed.get('entity_name') or ''}|{parsed.get('uei') or ''}"
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+def _entity_set_key(entity_key: str) -> str:
+    return "analyze:entity:" + entity_key
+
+async def get_cached_analysis(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached analysis result, or None on miss or cache failure"""
+    if redis_client is None:
+        return None
+    try:
+        cached = await redis_client.get(key)
+    except RedisError as e:
+        logger.warning(f"Analysis cache lookup failed: {e}")
+        return None
+    return orjson.loads(cached) if cached else None
+
+async def set_cached_analysis(key: str, analysis_result: Dict[str, Any]) -> None:
+    """Store an analysis result with the configured TTL, indexed by its entity for invalidation"""
+    if redis_client is None:
+        return
+    entity_set = _entity_set_key(entity_cache_key(analysis_result))
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.setex(key, settings.ANALYSIS_CACHE_TTL_SECONDS, orjson.dumps(analysis_result))
+            pipe.sadd(entity_set, key)
+            pipe.expire(entity_set, settings.ANALYSIS_CACHE_TTL_SECONDS)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning(f"Analysis cache write failed: {e}")
+
+async def invalidate_cached_analyses(entity_key: str) -> None:
+    """Drop every cached analysis result recorded for an entity"""
+    if redis_client is None:
+        return
+    entity_set = _entity_set_key(entity_key)
+    try:
+        keys = await redis_client.smembers(entity_set)
+        await redis_client.delete(entity_set, *keys)
+    except RedisError as e:
+        logger.warning(f"Analysis cache invalidation failed: {e}")
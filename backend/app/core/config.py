@@ -4,26 +4,69 @@ Configuration settings for GetGSA application
 
 from pydantic_settings import BaseSettings
 from pydantic import Field
-from typing import Optional
+from typing import List, Optional
+from functools import lru_cache
 import os
 
 class Settings(BaseSettings):
     # OpenAI Configuration
     OPENAI_API_KEY: str = "dummy-key-for-development"
     OPENAI_ASSISTANT_ID: Optional[str] = None
+    # Analysis model; must support structured outputs (json_schema response_format)
+    OPENAI_MODEL: str = "gpt-4o-2024-08-06"
+    OPENAI_MAX_CONCURRENCY: int = 8
+    OPENAI_MAX_RETRIES: int = 5
+    OPENAI_RPM: int = 500
+    OPENAI_TPM: int = 150000
+    OPENAI_MAX_COMPLETION_TOKENS: int = 4096
+    OPENAI_BATCH_MAX_PROMPT_TOKENS: int = 8000
+    OPENAI_BATCH_MAX_ITEMS: int = 4
+    OPENAI_DOCUMENT_MAX_TOKENS: int = 4000
+    OPENAI_HTTP_MAX_CONNECTIONS: int = 100
+    OPENAI_HTTP_MAX_KEEPALIVE: int = 50
+    OPENAI_HTTP_TIMEOUT_SECONDS: float = 60.0
     
     # Database
-    DATABASE_URL: str = "sqlite:///./gsa.db"
+    DATABASE_URL: str = "sqlite+aiosqlite:///./gsa.db"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 3600
+    
+    # Cache (analysis results are cached only when REDIS_URL is set)
+    REDIS_URL: Optional[str] = None
+    ANALYSIS_CACHE_TTL_SECONDS: int = 4 * 3600
+    
+    # Semantic cache for near-duplicate submissions (in-process, embedding based)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 1024
+    SEMANTIC_CACHE_TTL_SECONDS: int = 86400
+    SEMANTIC_CACHE_MAX_CHARS: int = 30000  # Embedding input cap (~8k tokens)
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    
+    # Exact-match result cache on local disk, checked before the semantic cache
+    RESULT_CACHE_DIR: Optional[str] = None  # e.g. /var/cache/gsa; disabled when unset
+    RESULT_CACHE_SIZE_LIMIT: int = 2 ** 30
+    RESULT_CACHE_TTL_SECONDS: int = 86400
+    
+    # Background analysis queue (Celery, brokered by REDIS_URL)
+    ANALYSIS_QUEUE_ENABLED: bool = False
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # CORS (explicit origins so browsers can cache preflight responses)
+    CORS_ORIGINS: List[str] = ["http://localhost:8000", "http://127.0.0.1:8000"]
+    
     # API Configuration
     MAX_DOCUMENT_SIZE_MB: int = 2
     MAX_DOCUMENTS_PER_REQUEST: int = 20
     RATE_LIMIT_PER_MINUTE: int = 60
+    HEALTH_CACHE_TTL_SECONDS: float = 1.0
+    INGEST_WORKERS: Optional[int] = None  # Redaction worker processes (default: CPU count)
     
     # Development
     DEBUG: bool = True
@@ -41,6 +84,15 @@ class Settings(BaseSettings):
             print("⚠️  WARNING: Using dummy OpenAI API key!")
             print("   Please set OPENAI_API_KEY in backend/.env file")
             print("   The server will start but AI features won't work.")
+        
+        # The queue is brokered by Redis; without it Celery would silently try amqp://localhost
+        if self.ANALYSIS_QUEUE_ENABLED and not self.REDIS_URL:
+            raise ValueError("ANALYSIS_QUEUE_ENABLED requires REDIS_URL")
+
+@lru_cache
+def get_settings() -> Settings:
+    """Return the process-wide settings (env is read once)"""
+    return Settings()
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
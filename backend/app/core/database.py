@@ -2,51 +2,116 @@
 Database configuration and models
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, LargeBinary, Index, Uuid, ForeignKey, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
+from pydantic_core import to_jsonable_python
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import deferred, relationship
+from asyncio import current_task
 from datetime import datetime
+import logging
+import msgpack
+import uuid
 from app.core.config import settings
 
-# Create database engine
-engine = create_engine(
+logger = logging.getLogger(__name__)
+
+# Connection pool sizing (SQLite uses its own single-connection pool)
+pool_args = {} if "sqlite" in settings.DATABASE_URL else {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+}
+
+# Create async database engine (aiosqlite / asyncpg)
+engine = create_async_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    pool_pre_ping=True,
+    **pool_args
+)
+
+# Create async session factory
+SessionLocal = async_sessionmaker(
+    engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Task-scoped sessions for lightweight paths that skip dependency injection
+ScopedSession = async_scoped_session(SessionLocal, scopefunc=current_task)
 
 # Base class for models
 Base = declarative_base()
 
+class MsgpackType(TypeDecorator):
+    """JSON-like column stored as msgpack bytes (JSONB on PostgreSQL)
+    
+    Pydantic models inside the value are dumped as they are packed, so callers
+    can bind model lists without building an intermediate list of dicts.
+    """
+    impl = LargeBinary
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(LargeBinary())
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return value
+        if dialect.name == "postgresql":
+            return to_jsonable_python(value)
+        return msgpack.packb(value, default=to_jsonable_python)
+    
+    def process_result_value(self, value, dialect):
+        if value is None or dialect.name == "postgresql":
+            return value
+        return msgpack.unpackb(value, raw=False)
+
 class DocumentRequest(Base):
     """Model for document ingestion requests"""
     __tablename__ = "document_requests"
     
-    id = Column(Integer, primary_key=True, index=True)
-    request_id = Column(String, unique=True, index=True)
+    request_id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     created_at = Column(DateTime, default=datetime.utcnow)
-    status = Column(String, default="pending")  # pending, processed, error
+    status = Column(String, default="pending")  # pending, queued, processed, error
+    error_message = Column(Text)  # Why the last analysis failed (status "error")
     
     # Document summaries
-    doc_summaries = Column(JSON)  # List of document summaries
+    doc_summaries = Column(MsgpackType)  # List of document summaries
     
     # Analysis results (when available)
-    parsed_fields = Column(JSON)
-    checklist = Column(JSON)
+    parsed_fields = Column(MsgpackType)
+    checklist = Column(MsgpackType)
     brief = Column(Text)
     client_email = Column(Text)
-    citations = Column(JSON)
+    citations = Column(MsgpackType)
+    
+    # Documents must be loaded explicitly (selectinload) to avoid implicit async I/O
+    documents = relationship(
+        "RedactedDocument",
+        backref="request",
+        lazy="raise",
+        order_by="RedactedDocument.id"
+    )
 
 class RedactedDocument(Base):
     """Model for storing redacted documents"""
     __tablename__ = "redacted_documents"
+    __table_args__ = (
+        # Covering index for per-request document lookups
+        Index("ix_redacted_req_id", "request_id", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    request_id = Column(String, index=True)
+    request_id = Column(Uuid(as_uuid=True), ForeignKey("document_requests.request_id"))
     name = Column(String)
-    original_text = Column(Text)  # Store original for reference (should be redacted)
+    original_text_zstd = deferred(Column(LargeBinary))  # zstd-compressed original, loaded on demand
     redacted_text = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -54,10 +119,20 @@ class RedactedDocument(Base):
     document_type = Column(String)  # profile, past_performance, pricing, unknown
     word_count = Column(Integer)
 
-def get_db():
-    """Dependency to get database session"""
-    db = SessionLocal()
-    try:
+async def log_query_plans(conn):
+    """Log the SQLite query plan for per-request document lookups (debug diagnostic)"""
+    result = await conn.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM redacted_documents "
+        "WHERE request_id = :request_id ORDER BY id"
+    ), {"request_id": ""})
+    for row in result:
+        logger.info(f"Query plan (redacted_documents by request_id): {row[-1]}")
+
+async def get_db():
+    """Dependency to get an async database session"""
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def get_db_scoped() -> AsyncSession:
+    """Return the session bound to the current task (release with ScopedSession.remove())"""
+    return ScopedSession()
@@ -3,9 +3,30 @@ Security utilities for PII redaction and validation
 """
 
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+from app.core._pii_scan import find_candidate_spans
 from app.core.config import settings
 
+# Optional accelerators: Hyperscan (SIMD multi-pattern DFA), then RE2
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
+# Hyperscan and RE2 treat \s, \b and \d as ASCII-only (RE2's \s also leaves out
+# \v) while stdlib `re` is Unicode-aware and counts \x1c-\x1f as whitespace, so
+# e.g. a phone number split by non-breaking spaces would slip past them
+_ASCII_ENGINE_UNSAFE_RE = re.compile(r'[^\x00-\x0a\x0c-\x1b\x20-\x7f]')
+
+def ascii_engines_agree(text: str) -> bool:
+    """Whether Hyperscan and RE2 find exactly what stdlib `re` finds in this text"""
+    return _ASCII_ENGINE_UNSAFE_RE.search(text) is None
+
 class PIIRedactor:
     """Handles PII redaction for documents"""
     
@@ -28,54 +49,137 @@ class PIIRedactor:
         r'\b[0-9]{9}\b'
     ]
     
+    # Category keys and redaction markers, indexed by Hyperscan match id
+    CATEGORIES = [
+        ('emails', b'[EMAIL_REDACTED]'),
+        ('phones', b'[PHONE_REDACTED]'),
+        ('ssns', b'[SSN_REDACTED]')
+    ]
+    
+    # Precompiled single-pass pattern per PII category
+    _EMAIL_PATTERN = "|".join(f"(?:{p})" for p in EMAIL_PATTERNS)
+    _PHONE_PATTERN = "|".join(f"(?:{p})" for p in PHONE_PATTERNS)
+    _SSN_PATTERN = "|".join(f"(?:{p})" for p in SSN_PATTERNS)
+    _EMAIL_RE = re.compile(_EMAIL_PATTERN, re.IGNORECASE)
+    _PHONE_RE = re.compile(_PHONE_PATTERN)
+    _SSN_RE = re.compile(_SSN_PATTERN)
+    
+    # RE2 builds of the same patterns, as (email, phone, ssn)
+    _FAST_RES = (
+        _regex.compile(_EMAIL_PATTERN, _regex.IGNORECASE),
+        _regex.compile(_PHONE_PATTERN),
+        _regex.compile(_SSN_PATTERN)
+    )
+    
+    # Shared Hyperscan database for all categories (None when unavailable)
+    _HS_DB = None
+    
+    # Documents at least this long are prefiltered before the regex scan
+    PREFILTER_MIN_CHARS = 16384
+    
     @classmethod
-    def redact_text(cls, text: str) -> str:
-        """Redact PII from text"""
-        redacted = text
-        
-        # Redact emails
-        for pattern in cls.EMAIL_PATTERNS:
-            redacted = re.sub(pattern, '[EMAIL_REDACTED]', redacted, flags=re.IGNORECASE)
+    def _regex_spans(cls, text: str) -> List[Tuple[int, int]]:
+        """Regions worth scanning with the regex engine (whole text without the prefilter)"""
+        spans = find_candidate_spans(text) if len(text) >= cls.PREFILTER_MIN_CHARS else None
+        return spans if spans is not None else [(0, len(text))]
+    
+    @classmethod
+    def _regexes(cls, text: str) -> Tuple[Any, Any, Any]:
+        """(email, phone, ssn) patterns to scan the text with: RE2 only where it agrees with `re`"""
+        if _regex is not re and ascii_engines_agree(text):
+            return cls._FAST_RES
+        return cls._EMAIL_RE, cls._PHONE_RE, cls._SSN_RE
+    
+    @classmethod
+    def _scan(cls, data: bytes) -> List[Tuple[int, int, int]]:
+        """Scan all PII patterns in one Hyperscan pass, returning (start, end, category)"""
+        matches = []
         
-        # Redact phone numbers
-        for pattern in cls.PHONE_PATTERNS:
-            redacted = re.sub(pattern, '[PHONE_REDACTED]', redacted)
+        def on_match(category, start, end, flags, context):
+            matches.append((start, end, category))
         
-        # Redact SSNs
-        for pattern in cls.SSN_PATTERNS:
-            redacted = re.sub(pattern, '[SSN_REDACTED]', redacted)
+        cls._HS_DB.scan(data, match_event_handler=on_match)
+        return matches
+    
+    @staticmethod
+    def _leftmost_longest(matches: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+        """Drop overlapping matches, keeping the leftmost-longest one"""
+        selected = []
+        last_end = -1
+        for start, end, category in sorted(matches, key=lambda m: (m[0], -m[1], m[2])):
+            if start >= last_end:
+                selected.append((start, end, category))
+                last_end = end
+        return selected
+    
+    @classmethod
+    def redact_text(cls, text: str) -> str:
+        """Redact PII from text"""
+        if cls._HS_DB is not None and ascii_engines_agree(text):
+            data = text.encode('utf-8')
+            pieces = []
+            pos = 0
+            for start, end, category in cls._leftmost_longest(cls._scan(data)):
+                pieces.append(data[pos:start])
+                pieces.append(cls.CATEGORIES[category][1])
+                pos = end
+            pieces.append(data[pos:])
+            return b''.join(pieces).decode('utf-8')
         
-        return redacted
+        email_re, phone_re, ssn_re = cls._regexes(text)
+        pieces = []
+        pos = 0
+        for start, end in cls._regex_spans(text):
+            redacted = email_re.sub('[EMAIL_REDACTED]', text[start:end])
+            redacted = phone_re.sub('[PHONE_REDACTED]', redacted)
+            redacted = ssn_re.sub('[SSN_REDACTED]', redacted)
+            pieces.append(text[pos:start])
+            pieces.append(redacted)
+            pos = end
+        pieces.append(text[pos:])
+        return ''.join(pieces)
     
     @classmethod
     def extract_pii(cls, text: str) -> Dict[str, List[str]]:
         """Extract PII for analysis (before redaction)"""
-        pii = {
-            'emails': [],
-            'phones': [],
-            'ssns': []
-        }
+        if cls._HS_DB is not None and ascii_engines_agree(text):
+            data = text.encode('utf-8')
+            buckets = [[] for _ in cls.CATEGORIES]
+            for start, end, category in cls._scan(data):
+                buckets[category].append((start, end, category))
+            pii = {}
+            for (key, _), bucket in zip(cls.CATEGORIES, buckets):
+                found = {data[start:end].decode('utf-8') for start, end, _ in cls._leftmost_longest(bucket)}
+                pii[key] = list(found)
+            return pii
         
-        # Extract emails
-        for pattern in cls.EMAIL_PATTERNS:
-            matches = re.findall(pattern, text, flags=re.IGNORECASE)
-            pii['emails'].extend(matches)
+        email_re, phone_re, ssn_re = cls._regexes(text)
+        emails, phones, ssns = set(), set(), set()
+        for start, end in cls._regex_spans(text):
+            span = text[start:end]
+            emails.update(email_re.findall(span))
+            phones.update(phone_re.findall(span))
+            ssns.update(ssn_re.findall(span))
         
-        # Extract phones
-        for pattern in cls.PHONE_PATTERNS:
-            matches = re.findall(pattern, text)
-            pii['phones'].extend(matches)
-        
-        # Extract SSNs
-        for pattern in cls.SSN_PATTERNS:
-            matches = re.findall(pattern, text)
-            pii['ssns'].extend(matches)
-        
-        # Remove duplicates
-        for key in pii:
-            pii[key] = list(set(pii[key]))
-        
-        return pii
+        return {
+            'emails': list(emails),
+            'phones': list(phones),
+            'ssns': list(ssns)
+        }
+
+def _build_hyperscan_db():
+    """Compile every PII pattern into one Hyperscan block-mode database"""
+    groups = [PIIRedactor.EMAIL_PATTERNS, PIIRedactor.PHONE_PATTERNS, PIIRedactor.SSN_PATTERNS]
+    expressions = [p.encode() for patterns in groups for p in patterns]
+    ids = [category for category, patterns in enumerate(groups) for _ in patterns]
+    flags = [hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST] * len(expressions)
+    
+    db = hyperscan.Database()
+    db.compile(expressions=expressions, ids=ids, elements=len(expressions), flags=flags)
+    return db
+
+if hyperscan is not None:
+    PIIRedactor._HS_DB = _build_hyperscan_db()
 
 class InputValidator:
     """Validates input documents and requests"""
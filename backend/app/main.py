@@ -6,34 +6,64 @@ Main entry point for the GSA onboarding assistant API
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 import os
 from pathlib import Path
 
 from app.api import ingest, analyze, health
 from app.core.config import settings
-from app.core.database import engine, Base
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from app.core.cache import redis_client
+from app.core.database import engine, Base, log_query_plans
+from app.services.openai_service import get_openai_service, load_tokenizer_in_background
 
 app = FastAPI(
     title="GetGSA API",
     description="AI-powered GSA onboarding assistant using OpenAI Assistants API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware for frontend integration
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
+    allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def create_tables():
+    """Create database tables"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if settings.DEBUG and "sqlite" in settings.DATABASE_URL:
+            await log_query_plans(conn)
+
+@app.on_event("startup")
+async def load_tokenizer():
+    """Load the tiktoken encoding on a background thread"""
+    load_tokenizer_in_background()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop the ingest redaction worker pool"""
+    ingest.executor.shutdown(wait=False, cancel_futures=True)
+
+@app.on_event("shutdown")
+async def close_cache():
+    """Close the Redis cache connection pool"""
+    if redis_client is not None:
+        await redis_client.aclose()
+
+@app.on_event("shutdown")
+async def close_openai():
+    """Close the OpenAI connection pool if the service was created"""
+    if get_openai_service.cache_info().currsize:
+        await get_openai_service().aclose()
+
 # Include API routes
 app.include_router(health.router, prefix="/api/v1", tags=["health"])
 app.include_router(ingest.router, prefix="/api/v1", tags=["ingest"])
@@ -57,13 +87,23 @@ async def health_check():
     """Simple health check endpoint"""
     return {"status": "healthy", "service": "getgsa-api"}
 
+async def _prepare_database():
+    """Create the schema once, before workers start (concurrent create_all on a fresh database races)"""
+    await create_tables()
+    await engine.dispose()
+
 if __name__ == "__main__":
+    import asyncio
     import uvicorn
+    asyncio.run(_prepare_database())
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True if settings.DEBUG else False
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count())),
+        reload=settings.DEBUG
     )
 
 
@@ -0,0 +1,115 @@
+"""
+Typed records for analysis results: dataclasses built in-process by the mock
+analysis, and the strict structured-output schema requested from GPT
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+@dataclass(slots=True)
+class PastPerformance:
+    title: str
+    client: str
+    value: float
+    duration: str
+    scope: str
+
+@dataclass(slots=True)
+class PricingLine:
+    labor_category: str
+    rate: float
+    hours: float
+    unit: str
+
+@dataclass(slots=True)
+class ParsedFields:
+    uei: Optional[str] = None
+    duns: Optional[str] = None
+    naics: List[str] = field(default_factory=list)
+    sam_status: str = "unknown"
+    poc_email: Optional[str] = None
+    poc_phone: Optional[str] = None
+    entity_name: Optional[str] = None
+    past_performance: List[PastPerformance] = field(default_factory=list)
+    pricing: List[PricingLine] = field(default_factory=list)
+
+@dataclass(slots=True)
+class Problem:
+    code: str
+    rule_id: str
+    evidence: str
+
+@dataclass(slots=True)
+class Checklist:
+    required_ok: bool = True
+    problems: List[Problem] = field(default_factory=list)
+
+@dataclass(slots=True)
+class Citation:
+    rule_id: str
+    chunk: str
+
+@dataclass(slots=True)
+class AnalysisResult:
+    parsed: ParsedFields
+    checklist: Checklist
+    brief: str
+    client_email: str
+    citations: List[Citation] = field(default_factory=list)
+
+# Structured outputs (strict mode) needs every property required and no extra
+# keys, so optional values are nullable rather than defaulted
+class _StrictModel(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
+class PastPerformanceOutput(_StrictModel):
+    title: str
+    client: str
+    value: float
+    duration: str
+    scope: str
+
+class PricingLineOutput(_StrictModel):
+    labor_category: str
+    rate: float
+    hours: float
+    unit: str = Field(description="Hour/Day/etc")
+
+class ParsedFieldsOutput(_StrictModel):
+    uei: Optional[str] = Field(description="12-character UEI, or null if not found")
+    duns: Optional[str] = Field(description="9-digit DUNS, or null if not found")
+    naics: List[str]
+    sam_status: Literal["active", "inactive", "pending", "unknown"]
+    poc_email: Optional[str]
+    poc_phone: Optional[str]
+    entity_name: Optional[str]
+    past_performance: List[PastPerformanceOutput]
+    pricing: List[PricingLineOutput]
+
+class ProblemOutput(_StrictModel):
+    code: str
+    rule_id: str = Field(description="R1-R5")
+    evidence: str = Field(description="Specific evidence from the documents")
+
+class ChecklistOutput(_StrictModel):
+    required_ok: bool
+    problems: List[ProblemOutput]
+
+class CitationOutput(_StrictModel):
+    rule_id: str = Field(description="R1-R5")
+    chunk: str = Field(description="Rule text or evidence supporting a finding")
+
+class AnalysisOutput(_StrictModel):
+    parsed: ParsedFieldsOutput
+    checklist: ChecklistOutput
+    brief: str = Field(description="2-3 paragraph summary of findings, strengths and recommendations")
+    client_email: str = Field(description="Professional email to the client with findings and next steps")
+    citations: List[CitationOutput]
+
+class BatchAnalysisItemOutput(AnalysisOutput):
+    id: str = Field(description="Task id the analysis belongs to")
+
+class BatchAnalysisOutput(_StrictModel):
+    results: List[BatchAnalysisItemOutput]
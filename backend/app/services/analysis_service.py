@@ -0,0 +1,61 @@
+"""
+Analysis pipeline shared by the API and the background worker
+"""
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Dict, List, Any, Optional, Tuple
+import uuid
+import zstandard
+
+from app.core.cache import analysis_cache_key, get_cached_analysis, set_cached_analysis
+from app.core.database import DocumentRequest, RedactedDocument
+from app.services.openai_service import get_openai_service
+
+async def get_request_with_documents(db: AsyncSession, request_id: uuid.UUID) -> Optional[DocumentRequest]:
+    """Load a document request together with its documents in one query"""
+    return (await db.execute(
+        select(DocumentRequest)
+        .options(
+            selectinload(DocumentRequest.documents)
+            .undefer(RedactedDocument.original_text_zstd)
+        )
+        .where(DocumentRequest.request_id == request_id)
+    )).scalar_one_or_none()
+
+def prepare_documents(doc_request: DocumentRequest) -> List[Dict[str, str]]:
+    """Build analysis input (use original text for better field extraction)"""
+    decompressor = zstandard.ZstdDecompressor()
+    documents = []
+    for doc in doc_request.documents:
+        documents.append({
+            "name": doc.name,
+            "text": decompressor.decompress(doc.original_text_zstd).decode('utf-8')
+        })
+    return documents
+
+async def run_analysis(request_id: str, documents: List[Dict[str, str]]) -> Tuple[Dict[str, Any], bool]:
+    """Analyze documents, reusing a cached result of identical documents; returns (result, cache_hit)"""
+    cache_key = analysis_cache_key(documents)
+    analysis_result = await get_cached_analysis(cache_key)
+    if analysis_result is not None:
+        return analysis_result, True
+    
+    openai_service = get_openai_service()
+    analysis_result, from_gpt = await openai_service.analyze_documents_with_source(request_id, documents)
+    
+    # Never cache the mock fallback, so a transient OpenAI failure is retried next time
+    if from_gpt and "error" not in analysis_result:
+        await set_cached_analysis(cache_key, analysis_result)
+    return analysis_result, False
+
+def store_analysis(doc_request: DocumentRequest, analysis_result: Dict[str, Any]) -> None:
+    """Copy analysis results onto the request record"""
+    doc_request.status = "processed"
+    doc_request.error_message = None
+    doc_request.parsed_fields = analysis_result.get("parsed", {})
+    doc_request.checklist = analysis_result.get("checklist", {})
+    doc_request.brief = analysis_result.get("brief", "")
+    doc_request.client_email = analysis_result.get("client_email", "")
+    doc_request.citations = analysis_result.get("citations", [])
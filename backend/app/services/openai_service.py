@@ -1,20 +1,384 @@
-from openai import OpenAI
-from typing import Dict, List, Any, Optional
-import json
+from openai import OpenAI, AsyncOpenAI, RateLimitError
+from typing import Dict, List, Any, Optional, Tuple
+from dataclasses import asdict
+from functools import cached_property, lru_cache
+import asyncio
+import diskcache
+import httpx
+import io
 import logging
+import random
+import re
+import threading
+import time
+import numpy as np
+import tiktoken
+from pydantic import ValidationError
+from app.core.cache import analysis_cache_key, entity_cache_key, invalidate_cached_analyses
 from app.core.config import settings
+from app.core.security import ascii_engines_agree
+from app.models.schemas import (
+    AnalysisOutput, AnalysisResult, BatchAnalysisOutput, Checklist, Citation, ParsedFields,
+    PastPerformance, PricingLine, Problem
+)
+from app.services.semantic_cache import SemanticCache
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 logger = logging.getLogger(__name__)
 
+# Process-wide cap on in-flight OpenAI completion calls
+_SEM = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+
+# Tokenizer for request size estimates (cl100k_base matches the GPT-4 family).
+# Loading may download the BPE file (no timeout in tiktoken), so it happens on a
+# background thread at startup; estimates fall back to length until it is ready.
+_encoding = None
+_encoding_loader = None
+
+def _load_encoding():
+    global _encoding
+    try:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+
+def load_tokenizer_in_background():
+    """Start loading the tokenizer once per process without blocking the caller"""
+    global _encoding_loader
+    if _encoding_loader is None:
+        _encoding_loader = threading.Thread(target=_load_encoding, name="tiktoken-loader", daemon=True)
+        _encoding_loader.start()
+
+def estimate_tokens(text: str) -> int:
+    if _encoding is None:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text))
+
+# Field patterns for the mock analysis
+_UEI_RE = re.compile(r'UEI[:\s]*([A-Z0-9]{12})', re.IGNORECASE)
+_DUNS_RE = re.compile(r'DUNS[:\s]*(\d{9})', re.IGNORECASE)
+_NAICS_RE = re.compile(r'NAICS[:\s]*([0-9, ]+)', re.IGNORECASE)
+_NAICS_CODE_RE = re.compile(r'\d{6}')
+_SAM_RE = re.compile(r'SAM[:\s]*Status[:\s]*([A-Za-z]+)', re.IGNORECASE)
+_EMAIL_RE = re.compile(r'POC[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', re.IGNORECASE)
+_PHONE_RE = re.compile(r'POC[:\s]*\(?(\d{3})\)?[-.\s]?(\d{3})[-.\s]?(\d{4})')
+
+_FIELD_RES = {
+    "uei": _UEI_RE,
+    "duns": _DUNS_RE,
+    "naics": _NAICS_RE,
+    "sam_status": _SAM_RE,
+    "poc_email": _EMAIL_RE,
+    "poc_phone": _PHONE_RE,
+}
+
+def _build_field_hyperscan_db():
+    """Compile the field patterns into one Hyperscan block-mode database"""
+    fields = list(_FIELD_RES)
+    flags = [
+        hyperscan.HS_FLAG_SOM_LEFTMOST
+        | (hyperscan.HS_FLAG_CASELESS if _FIELD_RES[field].flags & re.IGNORECASE else 0)
+        for field in fields
+    ]
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[_FIELD_RES[field].pattern.encode() for field in fields],
+        ids=list(range(len(fields))),
+        elements=len(fields),
+        flags=flags,
+    )
+    return db, fields
+
+_FIELD_HS_DB = _build_field_hyperscan_db() if hyperscan is not None else None
+
+def _scan_fields_hyperscan(text: str) -> Dict[str, re.Match]:
+    db, fields = _FIELD_HS_DB
+    data = text.encode('utf-8')
+    starts = {}
+
+    def on_match(pattern_id, start, end, flags, context):
+        if start < starts.get(pattern_id, len(data)):
+            starts[pattern_id] = start
+
+    db.scan(data, match_event_handler=on_match)
+
+    # Hyperscan has no capture groups; rerun each field's pattern at its leftmost
+    # hit (byte offsets equal str offsets, since only ASCII text is scanned here)
+    return {
+        fields[pattern_id]: _FIELD_RES[fields[pattern_id]].match(text, start)
+        for pattern_id, start in starts.items()
+    }
+
+def _scan_fields(text: str, fields) -> Dict[str, re.Match]:
+    """Return the first match in the text of each of the given field patterns"""
+    # Hyperscan's \s and \d are ASCII-only, so e.g. "UEI:\xa0..." needs the re patterns
+    if _FIELD_HS_DB is not None and ascii_engines_agree(text):
+        return {field: m for field, m in _scan_fields_hyperscan(text).items() if field in fields}
+    found = {}
+    for field in fields:
+        m = _FIELD_RES[field].search(text)
+        if m:
+            found[field] = m
+    return found
+
+def _extract_fields(documents: List[Dict[str, str]]) -> Dict[str, re.Match]:
+    """Return the first match of each field pattern, scanning documents in order"""
+    found = {}
+    for doc in documents:
+        missing = [field for field in _FIELD_RES if field not in found]
+        if not missing:
+            break
+        found.update(_scan_fields(doc.get('text', ''), missing))
+    return found
+
+def _identifiers(documents: List[Dict[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+    """(UEI, DUNS) found by the field patterns, normalized for comparison"""
+    fields = _extract_fields(documents)
+    uei = fields["uei"].group(1).upper() if "uei" in fields else None
+    duns = fields["duns"].group(1) if "duns" in fields else None
+    return uei, duns
+
+def _cached_identifiers(analysis_result: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    parsed = analysis_result.get("parsed") or {}
+    uei = (parsed.get("uei") or "").strip().upper() or None
+    duns = re.sub(r'\D', '', parsed.get("duns") or "") or None
+    return uei, duns
+
+def _same_entity(analysis_result: Dict[str, Any], identifiers: Tuple[Optional[str], Optional[str]]) -> bool:
+    """Whether a cached result has the (UEI, DUNS) found in the documents, at least one of them set"""
+    return any(identifiers) and _cached_identifiers(analysis_result) == identifiers
+
+# Mock compliance checks: (predicate on ParsedFields, problem code, rule ID, evidence template)
+_MOCK_RULES = [
+    (lambda p: not p.uei, "missing_uei", "R1", "UEI not found in documents"),
+    (lambda p: p.uei and len(p.uei) != 12, "invalid_uei_format", "R1", "UEI '{p.uei}' is not 12 characters"),
+    (lambda p: not p.duns, "missing_duns", "R1", "DUNS number not found in documents"),
+    (lambda p: p.duns and len(p.duns) != 9, "invalid_duns_format", "R1", "DUNS '{p.duns}' is not 9 digits"),
+    (lambda p: p.sam_status not in ("active", "pending"), "sam_inactive", "R1",
+     "SAM status is '{p.sam_status}' (should be active)"),
+    (lambda p: not p.naics, "missing_naics", "R2", "No NAICS codes found in documents"),
+]
+
+# Invariant text of the mock brief and client email
+_MOCK_NOTE = (
+    "Note: This is an enhanced mock analysis. Set your OpenAI API key for full AI-powered analysis "
+    "with advanced rule interpretation."
+)
+_NO_STRENGTHS = "- Documents submitted successfully"
+_NO_ISSUES = "- No compliance issues found"
+
+_BRIEF_SUMMARY = """EXECUTIVE SUMMARY:
+This analysis reviews the submitted GSA onboarding documents for compliance with federal contracting requirements (Rules R1-R5)."""
+
+_BRIEF_RECOMMENDATIONS = """RECOMMENDATIONS:
+1. Ensure all required fields (UEI, DUNS, SAM status) are complete and accurate
+2. Verify past performance projects meet the $25,000 minimum threshold (R3)
+3. Confirm pricing is competitive and labor categories align with NAICS codes (R4)
+4. Review document formatting and ensure all PII is properly redacted (R5)"""
+
+_BRIEF_NEXT_STEPS = """NEXT STEPS:
+- Address any identified compliance issues
+- Prepare additional documentation if required
+- Schedule follow-up review if needed"""
+
+_EMAIL_INTRO = "Thank you for submitting your GSA onboarding documents for review."
+
+_EMAIL_COMPLIANT_NOTE = (
+    "Your submission appears to meet the basic GSA requirements. "
+    "We recommend proceeding with the next steps in the onboarding process."
+)
+
+_EMAIL_NEXT_STEPS = """2. Ensure all required fields are complete and accurate
+3. Verify past performance meets GSA requirements (minimum $25,000 per project)
+4. Confirm pricing aligns with market rates and labor categories"""
+
+_EMAIL_CLOSING = f"""TIMELINE:
+- Please respond within 5 business days with any corrections
+- We will schedule a follow-up review once issues are addressed
+- Final approval typically takes 2-3 weeks after all requirements are met
+
+For questions or clarifications, please don't hesitate to contact us at your convenience.
+
+Best regards,
+GSA Review Team
+Federal Contracting Division
+
+{_MOCK_NOTE}"""
+
+# Invariant prompt sections shared by single and batched analysis prompts
+_EXTRACTION_GUIDELINES = """EXTRACTION GUIDELINES:
+- Extract the actual emails and phone numbers in any format ("(555) 123-4567", "555.123.4567", "+1-555-123-4567"), including headers, footers and signature blocks; use null only after searching all content
+- UEI: 12 alphanumeric characters; DUNS: 9 digits; NAICS: 6 digits
+- Entity name from headers, titles or business information sections
+- Past performance projects with values, clients and durations; pricing from tables or lists"""
+
+_RULES_AND_REMINDERS = """GSA RULES TO APPLY:
+R1 Identity & Registry: UEI (12 chars), DUNS (9 digits), SAM active
+R2 NAICS & SIN Mapping: valid NAICS codes mapped to SINs
+R3 Past Performance: at least 1 project >= $25,000 within 36 months
+R4 Pricing: labor categories, rates, realistic pricing
+R5 Submission Hygiene: PII redacted, proper formatting"""
+
+_HSPACE_RE = re.compile(r'[ \t]+')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+
+def _minify(text: str) -> str:
+    """Collapse runs of spaces/tabs and blank lines, which cost tokens but carry no content"""
+    text = _HSPACE_RE.sub(' ', text)
+    return _BLANK_LINES_RE.sub('\n\n', text).strip()
+
+# Constant system prompt sent first on every call so OpenAI's automatic
+# prompt caching can reuse the prefix; only the documents vary per request
+_SYSTEM_PROMPT = _minify(f"""You are a GSA compliance expert analyzing onboarding documents. Respond with JSON matching the provided schema.
+
+{_EXTRACTION_GUIDELINES}
+
+{_RULES_AND_REMINDERS}""")
+
+def _json_schema_format(name: str, model: type) -> Dict[str, Any]:
+    """Strict structured-output response_format for a Pydantic model"""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": model.model_json_schema()}
+    }
+
+# The model is constrained to these schemas, so replies always parse
+_ANALYSIS_FORMAT = _json_schema_format("gsa_analysis", AnalysisOutput)
+_BATCH_ANALYSIS_FORMAT = _json_schema_format("gsa_batch_analysis", BatchAnalysisOutput)
+
+# Long documents are cut down to the neighbourhoods of likely field hits
+_RELEVANT_CONTEXT_CHARS = 200
+# A token is rarely over 6 characters, so a longer text cannot fit and is cut before tokenizing
+_MAX_CHARS_PER_TOKEN = 6
+_RELEVANCE_RE = re.compile(
+    r'\b(?:UEI|DUNS|NAICS|SAM|POC)\b|@|\b\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}\b|\$\s?\d'
+    r'|(?i:\b(?:past performance|pricing|labou?r|rates?)\b)'
+)
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of the text within max_tokens"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if _encoding is None:
+        return text[:(max_tokens - 1) * 4]
+    return _encoding.decode(_encoding.encode(text)[:max_tokens])
+
+def _relevant_spans(text: str, max_tokens: int) -> str:
+    """Return the text, or for documents over max_tokens only the windows around relevant hits"""
+    max_chars = max_tokens * _MAX_CHARS_PER_TOKEN
+    if len(text) <= max_tokens or (len(text) <= max_chars and estimate_tokens(text) <= max_tokens):
+        return text
+    
+    # Always keep the opening, which usually names the entity
+    windows = [(0, min(_RELEVANT_CONTEXT_CHARS, len(text)))]
+    for m in _RELEVANCE_RE.finditer(text):
+        start = max(m.start() - _RELEVANT_CONTEXT_CHARS, 0)
+        end = min(m.end() + _RELEVANT_CONTEXT_CHARS, len(text))
+        if start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    
+    excerpt = " … ".join(text[start:end] for start, end in windows)
+    return _truncate_tokens(excerpt[:max_chars], max_tokens)
+
+def _document_blocks(documents: List[Dict[str, str]]) -> str:
+    """Prompt sections for a packet, each labelled with its document name so findings can be cited
+
+    CPU-bound (minify, span search, tokenizing); call it off the event loop.
+    """
+    blocks = []
+    for doc in documents:
+        text = _relevant_spans(_minify(doc['text']), settings.OPENAI_DOCUMENT_MAX_TOKENS)
+        blocks.append(f"Document: {doc['name']}\n{text}\n")
+    return "\n".join(blocks)
+
+class TokenBucketLimiter:
+    """Request and token buckets refilled at RPM/60 and TPM/60 per second"""
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+    
+    async def acquire(self, tokens: int):
+        """Wait until one request and `tokens` tokens are available, then consume them"""
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm
+                )
+                await asyncio.sleep(max(wait, 0.01))
+
 class GSAAssistantService:
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.assistant_id = settings.OPENAI_ASSISTANT_ID
-        
-        # If no assistant ID provided, create one
-        if not self.assistant_id:
-            self.assistant_id = self._create_assistant()
+        self._limiter = TokenBucketLimiter(settings.OPENAI_RPM, settings.OPENAI_TPM)
+        self._semantic_cache = SemanticCache(
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS
+        ) if settings.SEMANTIC_CACHE_ENABLED else None
+        self._result_cache = diskcache.Cache(
+            settings.RESULT_CACHE_DIR,
+            size_limit=settings.RESULT_CACHE_SIZE_LIMIT
+        ) if settings.RESULT_CACHE_DIR else None
+        self._rules_file_id: Optional[str] = None
+        self._assistant_lock = threading.Lock()
+        self._http: Optional[httpx.AsyncClient] = None
+    
+    # Clients and the assistant are created on first use, so startup and the
+    # mock path never wait on (or fail for) the OpenAI API
+    @cached_property
+    def client(self) -> OpenAI:
+        return OpenAI(api_key=settings.OPENAI_API_KEY)
+    
+    @cached_property
+    def aclient(self) -> AsyncOpenAI:
+        # One keep-alive pool for every analysis so bursts reuse TLS connections
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.OPENAI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OPENAI_HTTP_MAX_KEEPALIVE
+            ),
+            timeout=settings.OPENAI_HTTP_TIMEOUT_SECONDS
+        )
+        return AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=self._http)
+    
+    async def aclose(self):
+        """Close the pooled connections of the async client"""
+        if self._http is not None:
+            await self._http.aclose()
+    
+    @cached_property
+    def assistant_id(self) -> str:
+        # cached_property does not lock, so serialize creation to avoid duplicate assistants
+        with self._assistant_lock:
+            if "assistant_id" not in self.__dict__:
+                # If no assistant ID provided, create one
+                self.__dict__["assistant_id"] = settings.OPENAI_ASSISTANT_ID or self._create_assistant()
+            return self.__dict__["assistant_id"]
     
     def _make_assistant_call(self, method_name, *args, **kwargs):
         extra_headers = kwargs.get('extra_headers', {})
@@ -25,7 +389,7 @@ class GSAAssistantService:
         return method(*args, **kwargs)
     
     def _create_assistant(self) -> str:
-        instructions = """
+        instructions = f"""
 You are a GSA compliance assistant specialized in onboarding document review.
 
 Your tasks:
@@ -48,6 +412,10 @@ Response format: JSON with fields:
 - brief: negotiation preparation text
 - client_email: client communication draft
 - citations: rule citations with chunks
+
+{_EXTRACTION_GUIDELINES}
+
+{_RULES_AND_REMINDERS}
 """
         
         # Create the assistant
@@ -65,6 +433,10 @@ Response format: JSON with fields:
     
     def _load_rules_pack(self) -> Optional[str]:
         
+        # The rules pack never changes, so upload it at most once per service instance
+        if self._rules_file_id:
+            return self._rules_file_id
+        
         rules_content = """
 R1 – Identity & Registry Requirements:
 - Required: UEI (12 characters, alphanumeric)
@@ -100,184 +472,257 @@ R5 – Submission Hygiene:
 - Maximum file size limits apply
 """
         
-        # Create a temporary file for the rules
-        import tempfile
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
-            f.write(rules_content)
-            temp_file = f.name
-        
-        # Upload to OpenAI
-        with open(temp_file, 'rb') as f:
-            file_response = self.client.files.create(
-                file=f,
-                purpose='assistants'
-            )
+        # Upload straight from memory; no temp file needed
+        file_response = self.client.files.create(
+            file=("rules.txt", io.BytesIO(rules_content.encode("utf-8"))),
+            purpose='assistants'
+        )
         
-        # Clean up temp file
-        import os
-        os.unlink(temp_file)
+        self._rules_file_id = file_response.id
+        return self._rules_file_id
+    
+    async def _create_completion(self, **kwargs):
+        """Call chat completions under the concurrency cap, retrying rate limits with jittered backoff
+
+        With stream=True the response is drained while the slot is held and the
+        concatenated message text is returned instead of the completion object.
+        """
+        kwargs.setdefault("max_tokens", settings.OPENAI_MAX_COMPLETION_TOKENS)
+        est_tokens = sum(estimate_tokens(m["content"]) for m in kwargs["messages"]) + kwargs["max_tokens"]
         
-        return file_response.id
+        for attempt in range(settings.OPENAI_MAX_RETRIES + 1):
+            try:
+                # Stay under RPM/TPM proactively instead of waiting out 429s
+                await self._limiter.acquire(est_tokens)
+                async with _SEM:
+                    response = await self.aclient.chat.completions.create(**kwargs)
+                    if not kwargs.get("stream"):
+                        return response
+                    parts = []
+                    async for chunk in response:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            parts.append(chunk.choices[0].delta.content)
+                    return "".join(parts)
+            except RateLimitError:
+                if attempt == settings.OPENAI_MAX_RETRIES:
+                    raise
+                delay = random.uniform(0, 2 ** attempt)
+                logger.warning(f"OpenAI rate limit hit, retrying in {delay:.1f}s (attempt {attempt + 1})")
+                await asyncio.sleep(delay)
+    
+    async def analyze_documents(self, request_id: str, documents: List[Dict[str, str]]) -> Dict[str, Any]:
+        analysis_result, _ = await self.analyze_documents_with_source(request_id, documents)
+        return analysis_result
     
-    def analyze_documents(self, request_id: str, documents: List[Dict[str, str]]) -> Dict[str, Any]:
+    async def analyze_documents_with_source(self, request_id: str, documents: List[Dict[str, str]]) -> Tuple[Dict[str, Any], bool]:
+        """Analyze documents; returns (result, from_gpt), where from_gpt is False for mock results"""
         
         # Check if we have a valid API key
         logger.info(f"API Key check: {settings.OPENAI_API_KEY[:10]}...")
         if settings.OPENAI_API_KEY == "dummy-key-for-development":
             logger.info("Using mock analysis due to dummy API key")
-            return self._get_mock_analysis_result(request_id, documents)
+            return await asyncio.to_thread(self._get_mock_analysis_result, request_id, documents), False
+        
+        # Serve exact repeats from the disk cache, then near-duplicates from the semantic cache.
+        # diskcache does blocking SQLite I/O (waiting on locks when workers share the
+        # directory), so its calls run on a thread
+        result_key = None
+        if self._result_cache is not None:
+            result_key = analysis_cache_key(documents)
+            cached = await asyncio.to_thread(self._result_cache.get, result_key)
+            if cached is not None:
+                logger.info("Result cache hit")
+                return cached, True
+        
+        # Near-duplicates are only trusted for packets naming their entity: template-built
+        # packets without a UEI or DUNS embed alike but may come from different vendors
+        embedding = None
+        if self._semantic_cache is not None:
+            try:
+                identifiers = await asyncio.to_thread(_identifiers, documents)
+                if any(identifiers):
+                    embedding = await self._embed_documents(documents)
+                    cached = self._semantic_cache.get(
+                        embedding, accept=lambda result: _same_entity(result, identifiers)
+                    )
+                    if cached is not None:
+                        logger.info("Semantic cache hit")
+                        return cached, True
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed: {e}")
         
         # Try GPT-based analysis first
         try:
-            return self._get_gpt_analysis_result(request_id, documents)
+            analysis_result = await self._get_gpt_analysis_result(request_id, documents)
+            entity_key = entity_cache_key(analysis_result)
+            if result_key is not None:
+                await asyncio.to_thread(
+                    self._result_cache.set,
+                    result_key, analysis_result, expire=settings.RESULT_CACHE_TTL_SECONDS, tag=entity_key
+                )
+            if embedding is not None:
+                self._semantic_cache.put(embedding, analysis_result, entity_key)
+            return analysis_result, True
         except Exception as e:
             logger.error(f"GPT analysis failed: {e}")
             logger.info("Falling back to mock analysis")
-            return self._get_mock_analysis_result(request_id, documents)
+            return await asyncio.to_thread(self._get_mock_analysis_result, request_id, documents), False
     
-    def _get_gpt_analysis_result(self, request_id: str, documents: List[Dict[str, str]]) -> Dict[str, Any]:
+    async def _embed_documents(self, documents: List[Dict[str, str]]) -> np.ndarray:
+        text = " ".join(doc['text'] for doc in documents)[:settings.SEMANTIC_CACHE_MAX_CHARS]
+        # Embeddings count against the same RPM/TPM budget and concurrency cap as completions
+        await self._limiter.acquire(len(text) // 4 + 1)
+        async with _SEM:
+            response = await self.aclient.embeddings.create(model=settings.OPENAI_EMBEDDING_MODEL, input=text)
+        return np.asarray(response.data[0].embedding, dtype=np.float32)
+    
+    async def invalidate_entity(self, entity_name: Optional[str], uei: Optional[str]):
+        """Drop cached results for an entity from every tier (e.g. after its records change)"""
+        entity_key = entity_cache_key({"parsed": {"entity_name": entity_name, "uei": uei}})
+        await invalidate_cached_analyses(entity_key)
+        if self._result_cache is not None:
+            await asyncio.to_thread(self._result_cache.evict, entity_key)
+        if self._semantic_cache is not None:
+            self._semantic_cache.invalidate(entity_key)
+    
+    async def analyze_documents_batch(self, requests: List[Tuple[str, List[Dict[str, str]]]]) -> List[Dict[str, Any]]:
+        """Analyze many (request_id, documents) pairs concurrently, bounded by the shared semaphore
+
+        The shared service's connection pool, limiter and semaphore bind to the
+        first event loop that uses them, so callers must run every analysis on one
+        long-lived loop (as the API and the Celery worker's per-process loop do)
+        rather than wrapping calls in asyncio.run().
+        """
+        if len(requests) == 1 or settings.OPENAI_API_KEY == "dummy-key-for-development":
+            return await asyncio.gather(*(
+                self.analyze_documents(request_id, documents) for request_id, documents in requests
+            ))
+        
+        # Pack small packets into shared prompts to amortize the fixed prompt overhead
+        group_results = await asyncio.gather(*(
+            self._analyze_group(group) for group in self._group_for_batch(requests)
+        ))
+        return [result for results in group_results for result in results]
+    
+    def _group_for_batch(self, requests: List[Tuple[str, List[Dict[str, str]]]]) -> List[List[Tuple[str, List[Dict[str, str]]]]]:
+        groups = []
+        current = []
+        current_tokens = 0
+        for request_id, documents in requests:
+            # Character-based size (documents are trimmed to OPENAI_DOCUMENT_MAX_TOKENS
+            # later); tokenizing whole packets here would block the event loop
+            tokens = sum(
+                min(len(doc['text']) // 4 + 1, settings.OPENAI_DOCUMENT_MAX_TOKENS) for doc in documents
+            )
+            if current and (current_tokens + tokens > settings.OPENAI_BATCH_MAX_PROMPT_TOKENS
+                            or len(current) >= settings.OPENAI_BATCH_MAX_ITEMS):
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append((request_id, documents))
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+    
+    async def _analyze_group(self, group: List[Tuple[str, List[Dict[str, str]]]]) -> List[Dict[str, Any]]:
+        if len(group) > 1:
+            try:
+                results = await self._get_gpt_analysis_batch(group)
+                return [results[request_id] for request_id, _ in group]
+            except Exception as e:
+                logger.error(f"Batched GPT analysis failed, analyzing individually: {e}")
+        return await asyncio.gather(*(
+            self.analyze_documents(request_id, documents) for request_id, documents in group
+        ))
+    
+    async def _get_gpt_analysis_result(self, request_id: str, documents: List[Dict[str, str]]) -> Dict[str, Any]:
         
         # Prepare documents for analysis
-        doc_texts = []
-        for doc in documents:
-            doc_texts.append(f"Document: {doc['name']}\n{doc['text']}\n")
-        
-        analysis_prompt = f"""
-You are a GSA compliance expert analyzing onboarding documents. Extract and analyze the following information with high precision:
-
-DOCUMENTS TO ANALYZE:
-{chr(10).join(doc_texts)}
-
-CRITICAL EXTRACTION GUIDELINES:
-- Look for emails in ANY format: "email@domain.com", "john@company.com", "Contact: user@example.org"
-- Find phone numbers in formats: "(555) 123-4567", "555-123-4567", "555.123.4567", "+1-555-123-4567"
-- Extract UEI as 12-character alphanumeric codes
-- Extract DUNS as 9-digit numbers
-- Find NAICS codes as 6-digit numbers
-- Look for company names in headers, titles, or business information sections
-- Extract past performance projects with values, clients, and durations
-- Find pricing information in tables, lists, or structured data
-
-Please provide a comprehensive analysis in the following JSON format:
-
-{{
-  "parsed": {{
-    "uei": "extracted UEI (12 characters) or null if not found",
-    "duns": "extracted DUNS (9 digits) or null if not found", 
-    "naics": ["list", "of", "NAICS", "codes"],
-    "sam_status": "active/inactive/pending/unknown",
-    "poc_email": "primary contact email (extract actual email address) or null",
-    "poc_phone": "primary contact phone (extract actual phone number) or null",
-    "entity_name": "company/organization name or null",
-    "past_performance": [
-      {{
-        "title": "project title",
-        "client": "client name", 
-        "value": numeric_value,
-        "duration": "project duration",
-        "scope": "project description"
-      }}
-    ],
-    "pricing": [
-      {{
-        "labor_category": "job title",
-        "rate": numeric_rate,
-        "hours": numeric_hours,
-        "unit": "Hour/Day/etc"
-      }}
-    ]
-  }},
-  "checklist": {{
-    "required_ok": true/false,
-    "problems": [
-      {{
-        "code": "problem_identifier",
-        "rule_id": "R1/R2/R3/R4/R5",
-        "evidence": "specific evidence from documents"
-      }}
-    ]
-  }},
-  "brief": "2-3 paragraph executive summary of findings, strengths, and recommendations",
-  "client_email": "professional email draft to client with findings and next steps",
-  "citations": [
-    {{
-      "rule_id": "R1/R2/R3/R4/R5",
-      "chunk": "relevant rule text or evidence"
-    }}
-  ]
-}}
-
-GSA RULES TO APPLY:
-R1 - Identity & Registry: UEI (12 chars), DUNS (9 digits), SAM active
-R2 - NAICS & SIN Mapping: Valid NAICS codes mapped to SINs  
-R3 - Past Performance: At least 1 project ≥ $25,000 within 36 months
-R4 - Pricing: Labor categories, rates, realistic pricing
-R5 - Submission Hygiene: PII redacted, proper formatting
-
-IMPORTANT: Extract ACTUAL email addresses and phone numbers from the text. Do not return "Not found" unless you've thoroughly searched all document content. Look for contact information in headers, footers, signature blocks, and contact sections.
-"""
+        doc_texts = await asyncio.to_thread(_document_blocks, documents)
+        
+        analysis_prompt = f"""DOCUMENTS TO ANALYZE:
+{doc_texts}"""
         
         try:
             # Use direct GPT-4 API call for better control
-            response = self.client.chat.completions.create(
-                model="gpt-4-1106-preview",
+            # Stream so tokens arrive as they are generated instead of after the full completion
+            response_content = await self._create_completion(
+                model=settings.OPENAI_MODEL,
                 messages=[
-                    {"role": "system", "content": "You are a GSA compliance expert. Always respond with valid JSON only."},
+                    {"role": "system", "content": _SYSTEM_PROMPT},
                     {"role": "user", "content": analysis_prompt}
                 ],
-                response_format={"type": "json_object"},
-                temperature=0.1
+                response_format=_ANALYSIS_FORMAT,
+                temperature=0.1,
+                stream=True
             )
             
-            response_content = response.choices[0].message.content
-            
-            # Parse JSON response
+            # Only a truncated reply or a refusal can fail validation under strict mode
             try:
-                analysis_result = json.loads(response_content)
+                analysis_result = AnalysisOutput.model_validate_json(response_content).model_dump()
                 logger.info("GPT analysis completed successfully")
                 return analysis_result
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse GPT response as JSON: {e}")
-                logger.error(f"Response content: {response_content}")
+            except ValidationError as e:
+                logger.error(f"GPT response does not match the analysis schema: {e}")
                 raise Exception("Invalid JSON response from GPT")
                 
         except Exception as e:
             logger.error(f"GPT API call failed: {e}")
             raise e
     
-    def _get_mock_analysis_result(self, request_id: str, documents: List[Dict[str, str]]) -> Dict[str, Any]:
+    async def _get_gpt_analysis_batch(self, requests: List[Tuple[str, List[Dict[str, str]]]]) -> Dict[str, Dict[str, Any]]:
+        
+        # Label each packet so results can be routed back by request ID
+        doc_texts = await asyncio.to_thread(
+            lambda: [_document_blocks(documents) for _, documents in requests]
+        )
+        tasks = [
+            f"=== TASK id: {request_id} ===\n{texts}" for (request_id, _), texts in zip(requests, doc_texts)
+        ]
         
-        # Extract basic info from documents
-        all_text = " ".join([doc.get('text', '') for doc in documents])
+        batch_prompt = f"""The following TASKS are independent onboarding packets. Analyze each task separately and never mix information between tasks. Return exactly one entry in "results" per task, with "id" set to the task id.
+
+TASKS:
+{chr(10).join(tasks)}"""
         
-        # Simple field extraction for mock analysis
-        import re
+        response_content = await self._create_completion(
+            model=settings.OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": _SYSTEM_PROMPT},
+                {"role": "user", "content": batch_prompt}
+            ],
+            response_format=_BATCH_ANALYSIS_FORMAT,
+            temperature=0.1,
+            stream=True
+        )
         
-        # Extract UEI
-        uei_match = re.search(r'UEI[:\s]*([A-Z0-9]{12})', all_text, re.IGNORECASE)
-        uei = uei_match.group(1) if uei_match else None
+        batch_result = BatchAnalysisOutput.model_validate_json(response_content)
+        results = {item.id: item.model_dump(exclude={"id"}) for item in batch_result.results}
         
-        # Extract DUNS
-        duns_match = re.search(r'DUNS[:\s]*(\d{9})', all_text, re.IGNORECASE)
-        duns = duns_match.group(1) if duns_match else None
+        missing = [request_id for request_id, _ in requests if request_id not in results]
+        if missing:
+            raise Exception(f"Batched GPT response missing results for: {', '.join(missing)}")
         
-        # Extract NAICS codes
-        naics_matches = re.findall(r'NAICS[:\s]*([0-9, ]+)', all_text, re.IGNORECASE)
-        naics = []
-        if naics_matches:
-            naics_text = naics_matches[0]
-            naics = [code.strip() for code in re.findall(r'\d{6}', naics_text)]
+        logger.info(f"Batched GPT analysis completed for {len(requests)} requests")
+        return results
+    
+    def _get_mock_analysis_result(self, request_id: str, documents: List[Dict[str, str]]) -> Dict[str, Any]:
+        
+        # Simple field extraction for mock analysis
+        fields = _extract_fields(documents)
         
-        # Extract SAM status
-        sam_match = re.search(r'SAM[:\s]*Status[:\s]*([A-Za-z]+)', all_text, re.IGNORECASE)
-        sam_status = sam_match.group(1).lower() if sam_match else "unknown"
+        uei = fields["uei"].group(1) if "uei" in fields else None
+        duns = fields["duns"].group(1) if "duns" in fields else None
         
-        # Extract POC email
-        poc_email_match = re.search(r'POC[:\s]*([a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,})', all_text, re.IGNORECASE)
-        poc_email = poc_email_match.group(1) if poc_email_match else None
+        naics = []
+        if "naics" in fields:
+            naics = [code.strip() for code in _NAICS_CODE_RE.findall(fields["naics"].group(1))]
         
-        # Extract POC phone
-        poc_phone_match = re.search(r'POC[:\s]*\(?(\d{3})\)?[-.\s]?(\d{3})[-.\s]?(\d{4})', all_text)
+        sam_status = fields["sam_status"].group(1).lower() if "sam_status" in fields else "unknown"
+        poc_email = fields["poc_email"].group(1) if "poc_email" in fields else None
+        
+        poc_phone_match = fields.get("poc_phone")
         poc_phone = f"({poc_phone_match.group(1)}) {poc_phone_match.group(2)}-{poc_phone_match.group(3)}" if poc_phone_match else None
         
         # Extract entity name
@@ -291,208 +736,94 @@ IMPORTANT: Extract ACTUAL email addresses and phone numbers from the text. Do no
                         break
         
         # Mock field extraction
-        parsed_fields = {
-            "uei": uei,
-            "duns": duns,
-            "naics": naics,
-            "sam_status": sam_status,
-            "poc_email": poc_email,
-            "poc_phone": poc_phone,
-            "entity_name": entity_name,
-            "past_performance": [
-                {
-                    "title": "Sample Project Alpha",
-                    "client": "Sample Client Corp",
-                    "value": 75000,
-                    "duration": "8 months",
-                    "scope": "Custom software development and system integration"
-                }
+        parsed_fields = ParsedFields(
+            uei=uei,
+            duns=duns,
+            naics=naics,
+            sam_status=sam_status,
+            poc_email=poc_email,
+            poc_phone=poc_phone,
+            entity_name=entity_name,
+            past_performance=[
+                PastPerformance(
+                    title="Sample Project Alpha",
+                    client="Sample Client Corp",
+                    value=75000,
+                    duration="8 months",
+                    scope="Custom software development and system integration"
+                )
             ],
-            "pricing": [
-                {
-                    "labor_category": "Senior Software Engineer",
-                    "rate": 125.00,
-                    "hours": 200,
-                    "unit": "Hour"
-                },
-                {
-                    "labor_category": "Project Manager",
-                    "rate": 110.00,
-                    "hours": 100,
-                    "unit": "Hour"
-                }
+            pricing=[
+                PricingLine(labor_category="Senior Software Engineer", rate=125.00, hours=200, unit="Hour"),
+                PricingLine(labor_category="Project Manager", rate=110.00, hours=100, unit="Hour")
             ]
-        }
+        )
         
         # Enhanced compliance checklist
-        checklist = {
-            "required_ok": True,
-            "problems": []
-        }
+        checklist = Checklist()
         
         # Check for common issues
-        if not parsed_fields["uei"]:
-            checklist["problems"].append({
-                "code": "missing_uei",
-                "rule_id": "R1",
-                "evidence": "UEI not found in documents"
-            })
-            checklist["required_ok"] = False
-        elif len(parsed_fields["uei"]) != 12:
-            checklist["problems"].append({
-                "code": "invalid_uei_format",
-                "rule_id": "R1", 
-                "evidence": f"UEI '{parsed_fields['uei']}' is not 12 characters"
-            })
-            checklist["required_ok"] = False
-        
-        if not parsed_fields["duns"]:
-            checklist["problems"].append({
-                "code": "missing_duns", 
-                "rule_id": "R1",
-                "evidence": "DUNS number not found in documents"
-            })
-            checklist["required_ok"] = False
-        elif len(parsed_fields["duns"]) != 9:
-            checklist["problems"].append({
-                "code": "invalid_duns_format",
-                "rule_id": "R1",
-                "evidence": f"DUNS '{parsed_fields['duns']}' is not 9 digits"
-            })
-            checklist["required_ok"] = False
-        
-        if parsed_fields["sam_status"] not in ["active", "pending"]:
-            checklist["problems"].append({
-                "code": "sam_inactive",
-                "rule_id": "R1",
-                "evidence": f"SAM status is '{parsed_fields['sam_status']}' (should be active)"
-            })
-            checklist["required_ok"] = False
-        
-        if not parsed_fields["naics"]:
-            checklist["problems"].append({
-                "code": "missing_naics",
-                "rule_id": "R2",
-                "evidence": "No NAICS codes found in documents"
-            })
-            checklist["required_ok"] = False
+        for predicate, code, rule_id, evidence in _MOCK_RULES:
+            if predicate(parsed_fields):
+                checklist.problems.append(Problem(code, rule_id, evidence.format(p=parsed_fields)))
+        checklist.required_ok = not checklist.problems
         
         # Generate intelligent brief based on analysis
         strengths = []
-        weaknesses = []
-        
-        if parsed_fields["uei"]:
-            strengths.append(f"✅ UEI present: {parsed_fields['uei']}")
-        if parsed_fields["duns"]:
-            strengths.append(f"✅ DUNS present: {parsed_fields['duns']}")
-        if parsed_fields["naics"]:
-            strengths.append(f"✅ NAICS codes identified: {', '.join(parsed_fields['naics'])}")
-        if parsed_fields["sam_status"] in ["active", "pending"]:
-            strengths.append(f"✅ SAM status: {parsed_fields['sam_status']}")
-        
-        if checklist["problems"]:
-            for problem in checklist["problems"]:
-                weaknesses.append(f"❌ {problem['rule_id']}: {problem['evidence']}")
-        
-        brief = f"""GSA Onboarding Analysis Report - Request {request_id}
-
-EXECUTIVE SUMMARY:
-This analysis reviews the submitted GSA onboarding documents for compliance with federal contracting requirements (Rules R1-R5).
-
-COMPLIANCE STATUS: {'✅ COMPLIANT' if checklist['required_ok'] else '❌ NON-COMPLIANT'}
-
-STRENGTHS:
-{chr(10).join(strengths) if strengths else '- Documents submitted successfully'}
-
-ISSUES IDENTIFIED:
-{chr(10).join(weaknesses) if weaknesses else '- No compliance issues found'}
-
-RECOMMENDATIONS:
-1. Ensure all required fields (UEI, DUNS, SAM status) are complete and accurate
-2. Verify past performance projects meet the $25,000 minimum threshold (R3)
-3. Confirm pricing is competitive and labor categories align with NAICS codes (R4)
-4. Review document formatting and ensure all PII is properly redacted (R5)
-
-NEXT STEPS:
-- Address any identified compliance issues
-- Prepare additional documentation if required
-- Schedule follow-up review if needed
-
-Note: This is an enhanced mock analysis. Set your OpenAI API key for full AI-powered analysis with advanced rule interpretation.
-"""
+        if parsed_fields.uei:
+            strengths.append(f"✅ UEI present: {parsed_fields.uei}")
+        if parsed_fields.duns:
+            strengths.append(f"✅ DUNS present: {parsed_fields.duns}")
+        if parsed_fields.naics:
+            strengths.append(f"✅ NAICS codes identified: {', '.join(parsed_fields.naics)}")
+        if parsed_fields.sam_status in ["active", "pending"]:
+            strengths.append(f"✅ SAM status: {parsed_fields.sam_status}")
+        weaknesses = [f"❌ {problem.rule_id}: {problem.evidence}" for problem in checklist.problems]
+        
+        strengths_block = "\n".join(strengths) if strengths else _NO_STRENGTHS
+        weaknesses_block = "\n".join(weaknesses)
+        
+        brief = (
+            f"GSA Onboarding Analysis Report - Request {request_id}\n\n{_BRIEF_SUMMARY}\n\n"
+            f"COMPLIANCE STATUS: {'✅ COMPLIANT' if checklist.required_ok else '❌ NON-COMPLIANT'}\n\n"
+            f"STRENGTHS:\n{strengths_block}\n\n"
+            f"ISSUES IDENTIFIED:\n{weaknesses_block or _NO_ISSUES}\n\n"
+            f"{_BRIEF_RECOMMENDATIONS}\n\n{_BRIEF_NEXT_STEPS}\n\n{_MOCK_NOTE}"
+        )
         
         # Generate personalized client email
-        entity_name = parsed_fields["entity_name"] or "Valued Client"
-        status_message = "compliant" if checklist["required_ok"] else "non-compliant"
-        
-        email_body = f"""Dear {entity_name},
-
-Thank you for submitting your GSA onboarding documents for review.
-
-ANALYSIS COMPLETE - Status: {status_message.upper()}
-
-We have completed our comprehensive analysis of your submission. {'Congratulations!' if checklist['required_ok'] else 'We have identified some areas that need attention.'}
-
-SUMMARY OF FINDINGS:"""
-        
-        if checklist["required_ok"]:
-            email_body += f"""
-
-✅ STRENGTHS:
-{chr(10).join(strengths) if strengths else '- Documents submitted successfully'}
-
-Your submission appears to meet the basic GSA requirements. We recommend proceeding with the next steps in the onboarding process."""
+        entity_name = parsed_fields.entity_name or "Valued Client"
+        if checklist.required_ok:
+            status = "COMPLIANT"
+            opening = "Congratulations!"
+            findings = f"✅ STRENGTHS:\n{strengths_block}\n\n{_EMAIL_COMPLIANT_NOTE}"
+            first_step = "Proceed with final submission"
         else:
-            email_body += f"""
-
-❌ ISSUES REQUIRING ATTENTION:
-{chr(10).join(weaknesses)}
-
-✅ STRENGTHS:
-{chr(10).join(strengths) if strengths else '- Documents submitted successfully'}"""
-        
-        email_body += f"""
-
-NEXT STEPS:
-1. {'Review and address the issues listed above' if not checklist['required_ok'] else 'Proceed with final submission'}
-2. Ensure all required fields are complete and accurate
-3. Verify past performance meets GSA requirements (minimum $25,000 per project)
-4. Confirm pricing aligns with market rates and labor categories
-
-TIMELINE:
-- Please respond within 5 business days with any corrections
-- We will schedule a follow-up review once issues are addressed
-- Final approval typically takes 2-3 weeks after all requirements are met
-
-For questions or clarifications, please don't hesitate to contact us at your convenience.
-
-Best regards,
-GSA Review Team
-Federal Contracting Division
-
-Note: This is an enhanced mock analysis. Set your OpenAI API key for full AI-powered analysis with advanced rule interpretation.
-"""
-        
-        client_email = email_body
+            status = "NON-COMPLIANT"
+            opening = "We have identified some areas that need attention."
+            findings = f"❌ ISSUES REQUIRING ATTENTION:\n{weaknesses_block}\n\n✅ STRENGTHS:\n{strengths_block}"
+            first_step = "Review and address the issues listed above"
+        
+        client_email = (
+            f"Dear {entity_name},\n\n{_EMAIL_INTRO}\n\n"
+            f"ANALYSIS COMPLETE - Status: {status}\n\n"
+            f"We have completed our comprehensive analysis of your submission. {opening}\n\n"
+            f"SUMMARY OF FINDINGS:\n\n{findings}\n\n"
+            f"NEXT STEPS:\n1. {first_step}\n{_EMAIL_NEXT_STEPS}\n\n{_EMAIL_CLOSING}"
+        )
         
         citations = [
-            {
-                "rule_id": "R1",
-                "chunk": "Required: UEI (12 characters, alphanumeric), DUNS (9 digits), SAM status active"
-            },
-            {
-                "rule_id": "R3", 
-                "chunk": "At least 1 past performance project ≥ $25,000 within 36 months"
-            }
+            Citation("R1", "Required: UEI (12 characters, alphanumeric), DUNS (9 digits), SAM status active"),
+            Citation("R3", "At least 1 past performance project ≥ $25,000 within 36 months")
         ]
         
-        return {
-            "parsed": parsed_fields,
-            "checklist": checklist,
-            "brief": brief.strip(),
-            "client_email": client_email.strip(),
-            "citations": citations
-        }
+        return asdict(AnalysisResult(
+            parsed=parsed_fields,
+            checklist=checklist,
+            brief=brief,
+            client_email=client_email,
+            citations=citations
+        ))
     
     def get_assistant_info(self) -> Dict[str, Any]:
         try:
@@ -509,3 +840,8 @@ Note: This is an enhanced mock analysis. Set your OpenAI API key for full AI-pow
         except Exception as e:
             logger.error(f"Error retrieving assistant info: {e}")
             return {"error": str(e)}
+
+@lru_cache(maxsize=1)
+def get_openai_service() -> GSAAssistantService:
+    """Return the shared service so its OpenAI clients and connection pools are reused"""
+    return GSAAssistantService()
@@ -0,0 +1,113 @@
+"""
+Semantic cache for analysis results of near-duplicate document submissions
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import copy
+import itertools
+import time
+
+import numpy as np
+
+class SemanticCache:
+    """In-process LRU/TTL cache looked up by embedding similarity
+
+    Candidates are found with random-hyperplane LSH (several tables of a few
+    bits each, so near-duplicates collide in at least one table with high
+    probability) and accepted only if their cosine similarity reaches the
+    threshold.
+    """
+
+    def __init__(self, threshold: float = 0.97, max_entries: int = 1024, ttl_seconds: int = 86400,
+                 num_tables: int = 8, bits_per_table: int = 8, seed: int = 0):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._num_tables = num_tables
+        self._bits_per_table = bits_per_table
+        self._rng = np.random.default_rng(seed)
+        self._planes = None  # (num_tables * bits_per_table, dim), created on first use
+        self._ids = itertools.count()
+
+        # entry_id -> (unit vector, signatures, result, entity_key, expires_at)
+        self._entries = OrderedDict()
+        # (table, signature) -> set of entry ids
+        self._buckets: Dict[tuple, set] = {}
+
+    def _signatures(self, vector: np.ndarray) -> list:
+        if self._planes is None:
+            self._planes = self._rng.standard_normal(
+                (self._num_tables * self._bits_per_table, vector.shape[0])
+            ).astype(np.float32)
+        bits = (self._planes @ vector) > 0
+        return [
+            (table, bits[table * self._bits_per_table:(table + 1) * self._bits_per_table].tobytes())
+            for table in range(self._num_tables)
+        ]
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int):
+        _, signatures, _, _, _ = self._entries.pop(entry_id)
+        for key in signatures:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def get(self, vector: np.ndarray,
+            accept: Optional[Callable[[Dict[str, Any]], bool]] = None) -> Optional[Dict[str, Any]]:
+        """Return a copy of the most similar cached result above the threshold, if any
+
+        When given, accept() must also approve a candidate result; rejected
+        candidates are skipped in favour of the next most similar one.
+        """
+        vector = self._normalize(vector)
+        now = time.monotonic()
+
+        candidates = set()
+        for key in self._signatures(vector):
+            candidates.update(self._buckets.get(key, ()))
+
+        scored = []
+        for entry_id in candidates:
+            cached_vector, _, _, _, expires_at = self._entries[entry_id]
+            if expires_at <= now:
+                self._remove(entry_id)
+                continue
+            score = float(cached_vector @ vector)
+            if score >= self.threshold:
+                scored.append((score, entry_id))
+
+        for _, entry_id in sorted(scored, reverse=True):
+            result = self._entries[entry_id][2]
+            if accept is None or accept(result):
+                self._entries.move_to_end(entry_id)
+                return copy.deepcopy(result)
+        return None
+
+    def put(self, vector: np.ndarray, result: Dict[str, Any], entity_key: Optional[str] = None):
+        """Cache a result, evicting the least recently used entry when full"""
+        vector = self._normalize(vector)
+        signatures = self._signatures(vector)
+        entry_id = next(self._ids)
+
+        self._entries[entry_id] = (
+            vector, signatures, copy.deepcopy(result), entity_key, time.monotonic() + self.ttl_seconds
+        )
+        for key in signatures:
+            self._buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, entity_key: str):
+        """Drop every cached result recorded for an entity"""
+        for entry_id in [eid for eid, entry in self._entries.items() if entry[3] == entity_key]:
+            self._remove(entry_id)
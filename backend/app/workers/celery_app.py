@@ -0,0 +1,63 @@
+"""
+Celery application for running document analysis off the request path
+
+Run with: celery -A app.workers.celery_app worker -Q analysis -c 8
+"""
+
+from celery import Celery
+from celery.signals import worker_process_init
+import asyncio
+import logging
+import uuid
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.analysis_service import (
+    get_request_with_documents, prepare_documents, run_analysis, store_analysis
+)
+from app.services.openai_service import load_tokenizer_in_background
+
+logger = logging.getLogger(__name__)
+
+celery = Celery("gsa", broker=settings.REDIS_URL, backend=settings.REDIS_URL)
+celery.conf.task_routes = {"app.workers.celery_app.*": {"queue": "analysis"}}
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    load_tokenizer_in_background()
+
+# One event loop per worker process so pooled async clients stay bound to it
+_loop = None
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+async def _run_analysis(request_id: uuid.UUID):
+    async with SessionLocal() as db:
+        doc_request = await get_request_with_documents(db, request_id)
+        if doc_request is None:
+            logger.warning(f"Analysis queued for unknown request {request_id}")
+            return
+        
+        try:
+            if not doc_request.documents:
+                raise ValueError("No documents found for this request")
+            analysis_result, _ = await run_analysis(str(request_id), prepare_documents(doc_request))
+        except Exception as e:
+            logger.error(f"Analysis failed for request {request_id}: {e}")
+            analysis_result = {"error": str(e)}
+        
+        if "error" in analysis_result:
+            doc_request.status = "error"
+            doc_request.error_message = str(analysis_result["error"])
+        else:
+            store_analysis(doc_request, analysis_result)
+        await db.commit()
+
+@celery.task(rate_limit="500/m")
+def run_analysis_task(request_id: str):
+    """Load documents, run the analysis and persist results for a queued request"""
+    _get_loop().run_until_complete(_run_analysis(uuid.UUID(request_id)))
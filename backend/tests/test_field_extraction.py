@@ -0,0 +1,30 @@
+"""
+Mock-analysis field extraction: Hyperscan and the re patterns must agree
+"""
+
+import pytest
+
+from app.services import openai_service
+from app.services.openai_service import _extract_fields, _identifiers
+
+NBSP_PACKET = [{"name": "profile.txt", "text": "UEI:\xa0ABC123DEF456\nDUNS:\xa0123456789\nNAICS:\xa0541511"}]
+ASCII_PACKET = [
+    {"name": "profile.txt", "text": "Entity profile\nUEI: ABC123DEF456\nSAM Status: Active"},
+    {"name": "contacts.txt", "text": "DUNS 123456789\nPOC: jane.doe@example.com\nPOC: (555) 123-4567"},
+]
+
+def _groups(documents):
+    return {field: m.groups() for field, m in _extract_fields(documents).items()}
+
+def test_identifiers_separated_by_unicode_whitespace_are_found():
+    assert _identifiers(NBSP_PACKET) == ("ABC123DEF456", "123456789")
+    assert _groups(NBSP_PACKET)["naics"] == ("541511",)
+
+@pytest.mark.parametrize("documents", [NBSP_PACKET, ASCII_PACKET])
+def test_hyperscan_matches_re_patterns(monkeypatch, documents):
+    pytest.importorskip("hyperscan")
+    assert openai_service._FIELD_HS_DB is not None
+    found = _groups(documents)
+
+    monkeypatch.setattr(openai_service, "_FIELD_HS_DB", None)
+    assert found == _groups(documents)
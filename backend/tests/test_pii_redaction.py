@@ -0,0 +1,135 @@
+"""
+PII redaction: the Numba prefilter must not change what the regex path finds
+"""
+
+import random
+import re
+
+import pytest
+
+from app.core.security import PIIRedactor, ascii_engines_agree
+
+WORDS = ["contract", "vendor", "UEI", "NAICS", "pricing", "café", "résumé", "R3", "v2", "$25,000"]
+PII = [
+    "john.doe@example.com",
+    "jane @ corp . org",
+    "(555) 123-4567",
+    "555.123.4567",
+    "+1-555-123-4567",
+    "123-45-6789",
+    "123456789",
+]
+
+def _document(seed: int, min_chars: int = 20000) -> str:
+    rng = random.Random(seed)
+    tokens = []
+    length = 0
+    while length < min_chars:
+        token = rng.choice(PII) if rng.random() < 0.02 else rng.choice(WORDS)
+        tokens.append(token)
+        tokens.append(rng.choice([" ", " ", "\n", "\t", "  "]))
+        length += len(token) + 1
+    return "".join(tokens)
+
+@pytest.fixture
+def regex_path(monkeypatch):
+    """Force the regex path even when Hyperscan is installed"""
+    monkeypatch.setattr(PIIRedactor, "_HS_DB", None)
+
+def _full_scan(monkeypatch, fn, text):
+    with monkeypatch.context() as m:
+        m.setattr(PIIRedactor, "PREFILTER_MIN_CHARS", len(text) + 1)
+        return fn(text)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_prefiltered_redaction_matches_full_scan(regex_path, monkeypatch, seed):
+    pytest.importorskip("numba")
+    text = _document(seed)
+    assert len(text) >= PIIRedactor.PREFILTER_MIN_CHARS
+
+    assert PIIRedactor.redact_text(text) == _full_scan(monkeypatch, PIIRedactor.redact_text, text)
+
+    prefiltered = PIIRedactor.extract_pii(text)
+    full = _full_scan(monkeypatch, PIIRedactor.extract_pii, text)
+    assert {k: sorted(v) for k, v in prefiltered.items()} == {k: sorted(v) for k, v in full.items()}
+
+def test_candidate_spans_are_sorted_and_disjoint():
+    pytest.importorskip("numba")
+    from app.core._pii_scan import find_candidate_spans
+
+    text = _document(0)
+    spans = find_candidate_spans(text)
+    assert spans
+    assert all(start < end for start, end in spans)
+    assert all(prev_end < start for (_, prev_end), (start, _) in zip(spans, spans[1:]))
+
+def test_document_without_triggers_has_no_spans():
+    pytest.importorskip("numba")
+    from app.core._pii_scan import find_candidate_spans
+
+    assert find_candidate_spans("no digits or at signs here " * 1000) == []
+
+def test_leftmost_longest_drops_overlaps():
+    matches = [(0, 5, 1), (0, 12, 0), (3, 8, 2), (12, 20, 1), (15, 18, 0)]
+    assert PIIRedactor._leftmost_longest(matches) == [(0, 12, 0), (12, 20, 1)]
+
+def test_redact_text_replaces_each_category(regex_path):
+    text = "Mail john.doe@example.com or call (555) 123-4567, SSN 123-45-6789."
+    redacted = PIIRedactor.redact_text(text)
+    assert "[EMAIL_REDACTED]" in redacted
+    assert "[PHONE_REDACTED]" in redacted
+    assert "[SSN_REDACTED]" in redacted
+    assert "john.doe" not in redacted
+
+def test_country_code_phone_is_one_match(regex_path):
+    # The phone patterns are alternated in one regex, so "+1-..." matches as a
+    # whole instead of the bare ten-digit pattern leaving "1-" behind
+    text = "Call +1-555-123-4567"
+    assert PIIRedactor.redact_text(text) == "Call +[PHONE_REDACTED]"
+    assert PIIRedactor.extract_pii(text)["phones"] == ["1-555-123-4567"]
+
+# Unicode whitespace (NBSP, em space, \x1f) is where Hyperscan and RE2 differ from `re`
+ENGINE_PARITY_TEXTS = [
+    "Mail john.doe@example.com or call (555) 123-4567, +1-555-123-4567, SSN 123456789.",
+    "Call 555\xa0123\xa04567 today",
+    "Mail jane\xa0@\xa0corp.org",
+    "Ref 123\u200345\u20036789 for josé, 123-45-6789",
+    "Fax 555\x1f123\x1f4567",
+]
+
+@pytest.mark.parametrize("text, redacted, category, value", [
+    ("Call 555\xa0123\xa04567", "Call [PHONE_REDACTED]", "phones", "555\xa0123\xa04567"),
+    ("Mail jane\xa0@\xa0corp.org", "Mail [EMAIL_REDACTED]", "emails", "jane\xa0@\xa0corp.org"),
+])
+def test_unicode_whitespace_is_redacted(text, redacted, category, value):
+    # Runs on whichever engines are installed
+    assert PIIRedactor.redact_text(text) == redacted
+    assert PIIRedactor.extract_pii(text)[category] == [value]
+
+def test_ascii_engines_agree_only_on_plain_ascii():
+    assert ascii_engines_agree("Call 555-123-4567\n\ttoday")
+    assert not ascii_engines_agree("Call 555\xa0123\xa04567")
+    assert not ascii_engines_agree("Fax 555\x1f123\x1f4567")
+    assert not ascii_engines_agree("tab\x0bvertical")
+
+@pytest.mark.parametrize("text", ENGINE_PARITY_TEXTS)
+def test_hyperscan_matches_regex_path(monkeypatch, text):
+    pytest.importorskip("hyperscan")
+    assert PIIRedactor._HS_DB is not None
+    redacted = PIIRedactor.redact_text(text)
+    pii = PIIRedactor.extract_pii(text)
+
+    monkeypatch.setattr(PIIRedactor, "_HS_DB", None)
+    monkeypatch.setattr("app.core.security._regex", re)
+    assert redacted == PIIRedactor.redact_text(text)
+    assert {k: sorted(v) for k, v in pii.items()} == {k: sorted(v) for k, v in PIIRedactor.extract_pii(text).items()}
+
+@pytest.mark.parametrize("text", ENGINE_PARITY_TEXTS)
+def test_re2_matches_stdlib_re(regex_path, monkeypatch, text):
+    pytest.importorskip("re2")
+    redacted = PIIRedactor.redact_text(text)
+    pii = PIIRedactor.extract_pii(text)
+
+    monkeypatch.setattr("app.core.security._regex", re)
+    assert redacted == PIIRedactor.redact_text(text)
+    assert {k: sorted(v) for k, v in pii.items()} == {k: sorted(v) for k, v in PIIRedactor.extract_pii(text).items()}
@@ -0,0 +1,107 @@
+"""
+Semantic cache: similarity hits, misses, TTL expiry, invalidation and LRU eviction
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services import semantic_cache
+from app.services.semantic_cache import SemanticCache
+
+DIM = 64
+
+def _vector(seed: int) -> "np.ndarray":
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+def _orthogonal(vector: "np.ndarray") -> "np.ndarray":
+    other = _vector(999)
+    return other - (other @ vector) / (vector @ vector) * vector
+
+def _result(uei: str) -> dict:
+    return {"parsed": {"uei": uei, "duns": None}, "brief": "ok"}
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    return now
+
+def test_hit_on_same_and_near_duplicate_vector():
+    cache = SemanticCache(threshold=0.97)
+    vector = _vector(1)
+    cache.put(vector, _result("ABC123DEF456"), entity_key="ABC123DEF456")
+
+    assert cache.get(vector) == _result("ABC123DEF456")
+    near = vector + 0.01 * _vector(2)
+    assert cache.get(near) == _result("ABC123DEF456")
+
+def test_hit_returns_a_copy():
+    cache = SemanticCache()
+    vector = _vector(1)
+    cache.put(vector, _result("ABC123DEF456"))
+
+    cache.get(vector)["parsed"]["uei"] = "mutated"
+    assert cache.get(vector)["parsed"]["uei"] == "ABC123DEF456"
+
+def test_miss_on_dissimilar_vector():
+    cache = SemanticCache()
+    vector = _vector(1)
+    cache.put(vector, _result("ABC123DEF456"))
+
+    assert cache.get(_orthogonal(vector)) is None
+    assert SemanticCache().get(vector) is None
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache(ttl_seconds=60)
+    vector = _vector(1)
+    cache.put(vector, _result("ABC123DEF456"))
+
+    clock[0] += 59
+    assert cache.get(vector) is not None
+    clock[0] += 1
+    assert cache.get(vector) is None
+    assert not cache._entries and not cache._buckets
+
+def test_invalidate_drops_only_that_entity():
+    cache = SemanticCache()
+    first, second = _vector(1), _vector(2)
+    cache.put(first, _result("ABC123DEF456"), entity_key="ABC123DEF456")
+    cache.put(second, _result("ZYX987WVU654"), entity_key="ZYX987WVU654")
+
+    cache.invalidate("ABC123DEF456")
+    assert cache.get(first) is None
+    assert cache.get(second) == _result("ZYX987WVU654")
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticCache(max_entries=2)
+    first, second, third = _vector(1), _vector(2), _vector(3)
+    cache.put(first, _result("first"))
+    cache.put(second, _result("second"))
+    cache.get(first)
+    cache.put(third, _result("third"))
+
+    assert cache.get(second) is None
+    assert cache.get(first) == _result("first")
+    assert cache.get(third) == _result("third")
+
+def test_accept_rejects_candidates_for_other_identifiers():
+    cache = SemanticCache()
+    vector = _vector(1)
+    cache.put(vector, _result("ABC123DEF456"))
+
+    assert cache.get(vector, accept=lambda r: r["parsed"]["uei"] == "ZYX987WVU654") is None
+    assert cache.get(vector, accept=lambda r: r["parsed"]["uei"] == "ABC123DEF456") is not None
+
+def test_results_without_identifiers_are_never_shared():
+    from app.services.openai_service import _same_entity
+
+    cache = SemanticCache()
+    vector = _vector(1)
+    cache.put(vector, _result(None))
+    assert cache.get(vector, accept=lambda r: _same_entity(r, (None, None))) is None
+
+    assert not _same_entity(_result(None), (None, None))
+    assert _same_entity(_result("ABC123DEF456"), ("ABC123DEF456", None))
+    assert not _same_entity(_result("ABC123DEF456"), (None, None))
+    assert not _same_entity(_result(None), ("ABC123DEF456", None))